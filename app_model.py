@@ -0,0 +1,48 @@
+from array import array
+
+
+class RowModel:
+    """
+    Compact state for the Apply dialog list. Row i is described by parallel
+    arrays; `visible` holds the indices currently shown, in display order.
+    """
+    __slots__ = ("names", "patched", "checked", "thumb", "visible")
+
+    def __init__(self, names, patched_flags):
+        self.names = list(names)
+        count = len(self.names)
+        self.patched = array('b', (1 if p else 0 for p in patched_flags))
+        if len(self.patched) != count:
+            raise ValueError("names and patched_flags must have the same length")
+        # Gli elementi già patchati partono deselezionati
+        self.checked = array('b', (0 if p else 1 for p in self.patched))
+        self.thumb = array('i', [-1]) * count
+        self.visible = array('i', range(count))
+
+    @classmethod
+    def from_patches(cls, patches, is_patched):
+        return cls([p['app_name'] for p in patches], [is_patched(p['app_name']) for p in patches])
+
+    def __len__(self):
+        return len(self.visible)
+
+    def index_at(self, pos):
+        return self.visible[pos]
+
+    def toggle(self, index):
+        self.checked[index] = 0 if self.checked[index] else 1
+        return bool(self.checked[index])
+
+    def set_visible_checked(self, value):
+        flag = 1 if value else 0
+        for index in self.visible:
+            self.checked[index] = flag
+
+    def set_visible(self, indices):
+        self.visible = array('i', indices)
+
+    def show_all(self):
+        self.visible = array('i', range(len(self.names)))
+
+    def selected(self):
+        return [i for i, flag in enumerate(self.checked) if flag]
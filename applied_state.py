@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+MANIFEST_VERSION = 1
+# Letta una volta all'avvio: os.umask() non si può interrogare senza modificarla
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_mode(path):
+    """ Mode for the replacement of path: the current one, or 0666 minus umask for a new file """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def write_json_atomic(path, data):
+    folder = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=folder)
+    try:
+        # mkstemp crea file 0600: si mantengono i permessi dell'originale
+        os.chmod(tmp, _file_mode(path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.unlink(tmp)
+        raise
+
+
+class AppliedManifest:
+    """ What SkinX last applied to each ~/Applications shim """
+
+    def __init__(self, path):
+        self.path = path
+        self.apps = {}
+        self.load()
+
+    def load(self):
+        self.apps = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.apps = data.get("apps", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        write_json_atomic(self.path, {"version": MANIFEST_VERSION, "apps": self.apps})
+
+    @staticmethod
+    def build_entry(app, pack, sha, icon_hash=None):
+        return {
+            'icon_hash': icon_hash or file_sha256(app['icon_path']),
+            'icon_path': app['icon_path'],
+            'pack': pack,
+            'sha': sha,
+            'target': os.path.join(app['full_app_path'], "Contents")
+        }
+
+    @staticmethod
+    def shim_target(shim_path):
+        contents = os.path.join(shim_path, "Contents")
+        if os.path.islink(contents):
+            return os.readlink(contents)
+        return None
+
+    def diff(self, desired, user_apps_path):
+        """
+        desired: {app_name: entry}. Returns {app_name: (entry, needs_relink)}
+        for the apps whose icon or symlink target differs from what is on disk.
+        """
+        changes = {}
+        for app_name, entry in desired.items():
+            shim = os.path.join(user_apps_path, app_name)
+            relink = self.shim_target(shim) != entry['target']
+            previous = self.apps.get(app_name)
+            if relink or not previous or previous.get('icon_hash') != entry['icon_hash']:
+                changes[app_name] = (entry, relink)
+        return changes
+
+    def record(self, app_name, entry):
+        self.apps[app_name] = entry
+
+    def forget(self, app_name):
+        self.apps.pop(app_name, None)
+
+    def clear(self):
+        self.apps = {}
@@ -0,0 +1,521 @@
+"""
+End-to-end benchmarks on a synthetic Mac: a System/Applications tree with
+hundreds of .app bundles, an icon pack served by a local stand-in for the
+GitHub branches API and archive downloads, and a fake fileicon. Nothing on
+the real system is touched, so it runs on Linux as well.
+
+    python benchmark.py [--apps 800] [--icons 600] [--repeat 3] [--output bench.json]
+    python benchmark.py --compare bench_old.json
+
+Results are written as JSON (every run plus the median, in seconds); with
+--compare the medians are printed next to those of an earlier run.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import plistlib
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+RESULTS_VERSION = 1
+DEFAULT_OUTPUT = "benchmark.json"
+OWNER, REPO = "bench", "SkinX-icons"
+BRANCH = "bench-pack"
+APP_WORDS = ("Mail", "Safari", "Notes", "Photos", "Music", "Maps", "Calendar", "Reminders",
+             "Preview", "Books", "Podcasts", "Weather", "Clock", "Stocks", "Freeform", "Shortcuts")
+TEMPLATES = 8
+TEMPLATE_SIZE = 512
+UPDATED_RATIO = 0.05
+SEARCHES = ("m", "ma", "mai", "mail 1", "sfr", "cal 2", "zz")
+
+FAKE_FILEICON = """#!/bin/sh
+# fileicon stand-in: checks its arguments and marks the target folder
+[ "$1" = "set" ] && [ -d "$2" ] && [ -f "$3" ] || exit 1
+: > "$2/Icon.bench"
+"""
+
+
+# --- fixtures ---
+
+def app_name(i):
+    return f"{APP_WORDS[i % len(APP_WORDS)]} {i}"
+
+
+def make_apps(root, count):
+    apps_dir = os.path.join(root, "System", "Applications")
+    for i in range(count):
+        contents = os.path.join(apps_dir, app_name(i) + ".app", "Contents")
+        os.makedirs(contents, exist_ok=True)
+        with open(os.path.join(contents, "Info.plist"), 'wb') as f:
+            plistlib.dump({"CFBundleName": app_name(i), "CFBundleDisplayName": app_name(i),
+                           "CFBundleIdentifier": f"com.bench.app{i}"}, f)
+    return apps_dir
+
+
+def make_templates():
+    """ A few distinct images per format; icons reuse them so generation stays fast """
+    from PIL import Image as PILImage
+
+    templates = {".icns": [], ".png": []}
+    for t in range(TEMPLATES):
+        img = PILImage.new("RGBA", (TEMPLATE_SIZE, TEMPLATE_SIZE))
+        img.putdata([((x * 7 + t * 31) % 256, (y * 5 + t * 17) % 256, (x ^ y) % 256, 255)
+                     for y in range(TEMPLATE_SIZE) for x in range(TEMPLATE_SIZE)])
+        for ext, fmt in ((".icns", "ICNS"), (".png", "PNG")):
+            buf = io.BytesIO()
+            img.save(buf, format=fmt)
+            templates[ext].append(buf.getvalue())
+    return templates
+
+
+def make_pack(count, templates, revision=0):
+    """ {relative path: bytes}; a revision > 0 changes UPDATED_RATIO of the icons """
+    files = {"README.md": f"Synthetic pack, revision {revision}\n".encode()}
+    updated = max(1, int(count * UPDATED_RATIO)) if revision else 0
+    for i in range(count):
+        ext = ".png" if i % 3 == 2 else ".icns"
+        t = (i + (revision if i < updated else 0)) % TEMPLATES
+        files[app_name(i) + ext] = templates[ext][t]
+    return files
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def commit_sha(files):
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        digest.update(path.encode() + b"\0" + git_blob_sha(files[path]).encode())
+    return digest.hexdigest()
+
+
+def zip_pack(files, branch):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_STORED) as z:
+        for path, data in files.items():
+            z.writestr(f"{REPO}-{branch}/{path}", data)
+    return buf.getvalue()
+
+
+def make_fileicon(folder):
+    path = os.path.join(folder, "fileicon")
+    with open(path, 'w') as f:
+        f.write(FAKE_FILEICON)
+    os.chmod(path, 0o755)
+    return path
+
+
+# --- GitHub stand-in ---
+
+class FakeGitHub:
+    """
+    Serves one repository: the branches API, archive downloads (with Range
+    and ETag unless ranges=False; drop_after=N cuts the next archive response
+    after N bytes), the git trees endpoint and the raw files used by delta updates.
+    Raw URLs keep the /repos/<owner>/<repo> prefix since the API host is not
+    rewritten for a local server.
+    """
+
+    def __init__(self, branch, ranges=True):
+        self.branch = branch
+        self.ranges = ranges
+        self.drop_after = None
+        self.archive_log = []
+        self.revisions = {}
+        self.files = {}
+        self.archives = {}
+        self.head = None
+        self.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        # I client che chiudono a metà risposta non sono errori
+        self.server.handle_error = lambda request, client_address: None
+
+    @property
+    def api_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/repos/{OWNER}/{REPO}/branches"
+
+    @property
+    def archive_url(self):
+        return self.api_url.replace("/branches", f"/archive/refs/heads/{self.branch}.zip")
+
+    def publish(self, files):
+        sha = commit_sha(files)
+        if sha not in self.revisions:
+            self.revisions[sha] = {p: git_blob_sha(d) for p, d in files.items()}
+            self.files[sha] = dict(files)
+            self.archives[sha] = zip_pack(files, self.branch)
+        self.head = sha
+        return sha
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _routes(self, path):
+        prefix = f"/repos/{OWNER}/{REPO}/"
+        if not path.startswith(prefix):
+            return None
+        rest = path[len(prefix):]
+        if rest == "branches":
+            body = json.dumps([{"name": "main", "commit": {"sha": "0" * 40}},
+                               {"name": self.branch, "commit": {"sha": self.head}}]).encode()
+            return body, "application/json", '"%s"' % hashlib.sha1(body).hexdigest()
+        if rest == f"archive/refs/heads/{self.branch}.zip":
+            return self.archives[self.head], "application/zip", f'"{self.head}"'
+        if rest.startswith("git/trees/"):
+            tree = self.revisions.get(rest[len("git/trees/"):])
+            if tree is None:
+                return None
+            body = json.dumps({"sha": rest, "truncated": False, "tree": [
+                {"path": p, "type": "blob", "sha": s} for p, s in sorted(tree.items())]}).encode()
+            return body, "application/json", None
+        # raw.githubusercontent.com/<owner>/<repo>/<sha>/<path>
+        sha, _, rel = rest.partition("/")
+        data = self.files.get(sha, {}).get(unquote(rel))
+        return (data, "application/octet-stream", None) if data is not None else None
+
+    def _handler(self):
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                github.requests += 1
+                route = github._routes(self.path.split("?", 1)[0])
+                if route is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, content_type, etag = route
+                if etag and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                start, end = 0, len(body) - 1
+                archive = content_type == "application/zip"
+                ranged = github.ranges and self.headers.get("Range", "").startswith("bytes=")
+                if ranged and self.headers.get("If-Range") not in (None, etag):
+                    ranged = False
+                if ranged:
+                    first, _, last = self.headers["Range"][6:].partition("-")
+                    start = int(first or 0)
+                    end = min(int(last), end) if last else end
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                if archive:
+                    github.archive_log.append((self.headers.get("Range"), 206 if ranged else 200, start, end))
+                self.send_response(206 if ranged else 200)
+                if ranged:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(end - start + 1))
+                if github.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                if archive and github.drop_after is not None:
+                    # Connessione interrotta a metà: il client deve riprendere o ripartire
+                    cut, github.drop_after = github.drop_after, None
+                    self.wfile.write(body[start:min(end + 1, start + cut)])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:end + 1])
+
+        return Handler
+
+
+# --- runner ---
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, func, setup=None, repeat=None, **info):
+        runs = []
+        for _ in range(repeat or self.repeat):
+            if setup: setup()
+            start = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - start)
+        self.results[name] = dict(info, runs=[round(r, 6) for r in runs],
+                                  median=round(statistics.median(runs), 6), min=round(min(runs), 6))
+        print(f"  {name:<22} {self.results[name]['median'] * 1000:10.1f} ms", file=sys.stderr)
+        return runs
+
+
+def verify_pack(pack_path, files):
+    for rel, data in files.items():
+        with open(os.path.join(pack_path, rel), 'rb') as f:
+            if f.read() != data:
+                raise RuntimeError(f"{rel} differs after the download")
+
+
+def run_download_checks(bench, work, files):
+    """
+    Downloads that exercise the recovery paths of packs.fetch_archive: resume
+    after an interrupted transfer, restart from zero on a server without
+    Range support, and the parallel ranged path on an archive large enough to
+    be split. Each run is verified against the published files.
+    """
+    from packs import MIN_SEGMENT_SIZE, install_pack
+    from net import get_network
+
+    dl_dir = os.path.join(work, "checks")
+    pack_path = os.path.join(dl_dir, BRANCH)
+    big_files = dict(files, **{"big.bin": os.urandom(2 * MIN_SEGMENT_SIZE + 64 * 1024)})
+
+    def download(github, connections):
+        install_pack(github.archive_url, dl_dir, BRANCH, sha=github.head, connections=connections,
+                     retries=0, session=get_network())
+
+    def interrupted(github):
+        def setup():
+            shutil.rmtree(dl_dir, ignore_errors=True)
+            github.drop_after = len(github.archives[github.head]) // 2
+            try:
+                download(github, 1)
+            except Exception:
+                pass
+            else:
+                raise RuntimeError("the interrupted download did not fail")
+            del github.archive_log[:]
+        return setup
+
+    def expect(github, what, test):
+        if not any(test(rng, status, start, end) for rng, status, start, end in github.archive_log):
+            raise RuntimeError(f"{what} did not happen: {github.archive_log}")
+
+    resumable = FakeGitHub(BRANCH).start()
+    no_ranges = FakeGitHub(BRANCH, ranges=False).start()
+    segmented = FakeGitHub(BRANCH).start()
+    try:
+        resumable.publish(files)
+        no_ranges.publish(files)
+        segmented.publish(big_files)
+
+        def resume():
+            download(resumable, 1)
+            verify_pack(pack_path, files)
+            expect(resumable, "resume", lambda rng, status, start, end: status == 206 and start > 0)
+        bench.run("download.resume", resume, setup=interrupted(resumable))
+
+        def restart():
+            download(no_ranges, 1)
+            verify_pack(pack_path, files)
+            expect(no_ranges, "restart", lambda rng, status, start, end: rng and status == 200)
+        bench.run("download.restart", restart, setup=interrupted(no_ranges))
+
+        def parallel():
+            del segmented.archive_log[:]
+            download(segmented, 4)
+            verify_pack(pack_path, big_files)
+            parts = {start for _, status, start, end in segmented.archive_log if status == 206 and end > start}
+            if len(parts) < 2:
+                raise RuntimeError(f"the archive was not split: {segmented.archive_log}")
+        bench.run("download.segmented", parallel, setup=lambda: shutil.rmtree(dl_dir, ignore_errors=True),
+                  archive_bytes=len(segmented.archives[segmented.head]))
+    finally:
+        for github in (resumable, no_ranges, segmented):
+            github.stop()
+
+
+def run_benchmarks(work, apps=800, icons=600, repeat=3):
+    from launchpad import DockRefresher, set_refresher
+    from helper import PatcherHelper
+    from injector import FileiconBackend, IconInjector
+    from thumbs import ThumbnailCache, ThumbnailLoader, THUMB_SIZE, get_decode_pool, shutdown_decode_pool
+    from app_model import RowModel
+    from fuzzy import FuzzyIndex
+
+    root = os.path.join(work, "root")
+    home = os.path.join(work, "home")
+    base = os.path.join(work, "skinx")
+    darwin_dir = os.path.join(root, "private", "var", "folders", "bn", "bench", "0")
+    for folder in (home, base, darwin_dir):
+        os.makedirs(folder, exist_ok=True)
+
+    print(f"Generating {apps} apps and {icons} icons in {work}", file=sys.stderr)
+    make_apps(root, apps)
+    templates = make_templates()
+    github = FakeGitHub(BRANCH)
+    old_files = make_pack(icons, templates, revision=1)
+    old_sha = github.publish(old_files)
+    new_files = make_pack(icons, templates, revision=2)
+    github.start()
+
+    # Il Dock non va riavviato davvero: la richiesta viene solo contata
+    dock = DockRefresher(root, darwin_user_dir=darwin_dir, window=0, runner=lambda cmd: None)
+    set_refresher(dock)
+    injector = IconInjector(FileiconBackend(binary=make_fileicon(work)))
+    helper = PatcherHelper(injector=injector, root=root, home=home, base_path=base)
+    bench = Bench(repeat)
+    pack_path = os.path.join(helper.downloads_path, BRANCH)
+
+    try:
+        print("Running", file=sys.stderr)
+        http_dir = helper.http_cache().cache_dir
+        bench.run("branches.cold", lambda: helper.list_branches(github.api_url),
+                  setup=lambda: shutil.rmtree(http_dir, ignore_errors=True))
+        bench.run("branches.revalidate", lambda: helper.list_branches(github.api_url))
+
+        def branch():
+            return helper.find_branch(BRANCH, github.api_url)
+
+        def before_full():
+            github.publish(old_files)
+            shutil.rmtree(pack_path, ignore_errors=True)
+            helper.config.update({"installed_shas": {}})
+        bench.run("download.full", lambda: helper.download_pack(branch()), setup=before_full,
+                  archive_bytes=len(github.archives[old_sha]))
+
+        def before_delta():
+            if github.head != old_sha or helper._installed_sha(BRANCH) != old_sha:
+                before_full()
+                helper.download_pack(branch())
+            github.publish(new_files)
+        modes = []
+        bench.run("download.delta", lambda: modes.append(helper.download_pack(branch())['mode']),
+                  setup=before_delta, changed_icons=max(1, int(icons * UPDATED_RATIO)))
+        if set(modes) != {"delta"}:
+            raise RuntimeError(f"delta update fell back to a full download: {modes}")
+
+        def touch_pack():
+            st = os.stat(pack_path)
+            os.utime(pack_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        patches = helper.get_available_patches()
+        bench.run("patches.cold", helper.get_available_patches, setup=touch_pack, matches=len(patches))
+        bench.run("patches.warm", helper.get_available_patches)
+
+        paths = [p['icon_path'] for p in patches]
+        thumb_dir = os.path.join(work, "thumbs")
+
+        def load_thumbs():
+            delivered = []
+            loader = ThumbnailLoader(ThumbnailCache(thumb_dir), paths, lambda i, w, h, rgba: delivered.append(i),
+                                     THUMB_SIZE).start()
+            loader.join()
+            if len(delivered) != len(paths):
+                raise RuntimeError(f"{len(paths) - len(delivered)} thumbnails were not delivered")
+        # Processi del pool avviati prima della misura
+        get_decode_pool().submit(abs, 0).result()
+        bench.run("thumbnails.cold", load_thumbs, setup=lambda: shutil.rmtree(thumb_dir, ignore_errors=True),
+                  thumbnails=len(paths))
+        bench.run("thumbnails.warm", load_thumbs)
+
+        def build_model():
+            RowModel.from_patches(patches, helper.check_if_patched)
+            FuzzyIndex([(p['app_name'][:-4], p.get('display_name', "")) for p in patches])
+        bench.run("model.build", build_model)
+        index = FuzzyIndex([(p['app_name'][:-4], p.get('display_name', "")) for p in patches])
+        bench.run("model.search", lambda: [index.search(q) for q in SEARCHES], queries=len(SEARCHES))
+
+        def apply():
+            report = helper.apply_icons(patches)
+            if report.failed:
+                raise RuntimeError(f"{len(report.failed)} icons failed: {report.failed[0].error}")
+        bench.run("apply.cold", apply, setup=lambda: helper.restore_icons(reset_launchpad=False),
+                  apps=len(patches))
+        bench.run("apply.unchanged", apply)
+        bench.run("restore", lambda: helper.restore_icons(reset_launchpad=False), setup=apply)
+        dock.flush()
+        run_download_checks(bench, work, old_files)
+    finally:
+        github.stop()
+        helper.config.flush()
+        shutdown_decode_pool()
+
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "apps": apps,
+            "icons": icons,
+            "repeat": repeat,
+            "http_requests": github.requests,
+        },
+        "results": bench.results,
+    }
+
+
+def compare(old, new, out=sys.stdout):
+    for key in ("apps", "icons"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            out.write(f"warning: {key} differs ({old['meta'].get(key)} vs {new['meta'].get(key)})\n")
+    out.write(f"{'benchmark':<22} {'before':>10} {'after':>10} {'ratio':>7}\n")
+    for name, result in new["results"].items():
+        before = old["results"].get(name, {}).get("median")
+        after = result["median"]
+        if before:
+            out.write(f"{name:<22} {before * 1000:8.1f}ms {after * 1000:8.1f}ms {after / before:6.2f}x\n")
+        else:
+            out.write(f"{name:<22} {'-':>10} {after * 1000:8.1f}ms\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SkinX end-to-end benchmarks on synthetic data.")
+    parser.add_argument("--apps", type=int, default=800, help="number of .app bundles")
+    parser.add_argument("--icons", type=int, default=600, help="number of icons in the pack")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="results file (default: %(default)s)")
+    parser.add_argument("--compare", metavar="OLD", help="print the ratios against an earlier results file")
+    parser.add_argument("--workdir", help="keep the synthetic tree in this folder instead of a temporary one")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Il server locale non deve passare da un eventuale proxy
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = ",".join(
+        filter(None, [os.environ.get("NO_PROXY") or os.environ.get("no_proxy"), "127.0.0.1"]))
+
+    work = args.workdir or tempfile.mkdtemp(prefix="skinx-bench-")
+    try:
+        results = run_benchmarks(os.path.abspath(work), args.apps, min(args.icons, args.apps), args.repeat)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+
+# Condivisi con build_assets.py, che li importa da qui
+RENDERED_DIR = "rendered"
+MENU_ICON_SIZE = 80
+SCALES = (1, 2)
+
+_cache = {}
+
+
+def rendered_name(name, size, scale=1):
+    stem = os.path.splitext(name)[0]
+    return f"{stem}_{size}@{scale}x.png" if scale > 1 else f"{stem}_{size}.png"
+
+
+def _load_scaled(assets_dir, name, size, scale):
+    import wx
+    rendered = os.path.join(assets_dir, RENDERED_DIR, rendered_name(name, size, scale))
+    if os.path.exists(rendered):
+        return wx.Bitmap(rendered, wx.BITMAP_TYPE_PNG)
+    # Dai sorgenti senza build_assets: una sola riduzione alla misura finale
+    src = os.path.join(assets_dir, name)
+    if not os.path.exists(src):
+        return None
+    px = size * scale
+    return wx.Bitmap(wx.Image(src, wx.BITMAP_TYPE_ANY).Scale(px, px, wx.IMAGE_QUALITY_HIGH))
+
+
+def get_bitmap(assets_dir, name, size):
+    """
+    Bitmap of assets/<name> at size x size points, with the @2x rendition
+    for Retina displays when wx supports bitmap bundles. Cached per process.
+    """
+    import wx
+
+    key = (assets_dir, name, size)
+    if key in _cache:
+        return _cache[key]
+
+    bitmaps = []
+    for scale in SCALES:
+        if scale > 1 and not hasattr(wx, "BitmapBundle"):
+            break
+        bmp = _load_scaled(assets_dir, name, size, scale)
+        if bmp is None or not bmp.IsOk():
+            break
+        bitmaps.append(bmp)
+
+    if not bitmaps:
+        result = None
+    elif len(bitmaps) > 1:
+        result = wx.BitmapBundle.FromBitmaps(bitmaps)
+    else:
+        result = bitmaps[0]
+    _cache[key] = result
+    return result
@@ -26,7 +26,16 @@ if ! command -v pyinstaller &> /dev/null; then
     exit 1
 fi
 
-# 3. Build dell'App Bundle con PyInstaller
+# 3. Cataloghi delle lingue precompilati (marshal, più veloci da caricare del JSON)
+echo "🌍 Compilazione cataloghi lingua..."
+rm -rf lang/compiled
+python3 -c "from locales import compile_catalogs; compile_catalogs('lang')" || exit 1
+
+# Icone del menu pre-renderizzate alle misure di visualizzazione (1x e @2x)
+echo "🖼  Rendering asset del menu..."
+python3 build_assets.py || exit 1
+
+# 4. Build dell'App Bundle con PyInstaller
 echo "📦 Creazione App Bundle (.app)..."
 pyinstaller --noconsole --onedir --windowed \
     --name "$APP_NAME" \
@@ -43,7 +52,7 @@ fi
 
 echo "✅ App Bundle creato in $DIST_DIR/$APP_NAME.app"
 
-# 4. Creazione del DMG (Richiede create-dmg installato tramite brew)
+# 5. Creazione del DMG (Richiede create-dmg installato tramite brew)
 echo "💿 Creazione dell'installer DMG..."
 
 if command -v create-dmg &> /dev/null; then
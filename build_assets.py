@@ -0,0 +1,44 @@
+"""
+Pre-renders the menu icons at the size they are shown (plus @2x for Retina)
+so the app never resamples the 1024px sources at startup.
+Run by build.sh before PyInstaller; `python build_assets.py` does the same by hand.
+"""
+import os
+import sys
+
+from bitmaps import MENU_ICON_SIZE, RENDERED_DIR, SCALES, rendered_name
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_PATH, "assets")
+MENU_ICONS = ("apply.png", "sel.png", "pref.png", "docs.png")
+
+
+def render_assets(src_dir=ASSETS_DIR, out_dir=None, names=MENU_ICONS, sizes=(MENU_ICON_SIZE,), scales=SCALES, force=False):
+    """ Writes <out_dir>/<stem>_<size>[@2x].png for every source; up-to-date files are skipped """
+    from PIL import Image as PILImage
+
+    out_dir = out_dir or os.path.join(src_dir, RENDERED_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name in names:
+        src = os.path.join(src_dir, name)
+        if not os.path.exists(src):
+            continue
+        src_mtime = os.stat(src).st_mtime
+        img = None
+        for size in sizes:
+            for scale in scales:
+                dest = os.path.join(out_dir, rendered_name(name, size, scale))
+                if not force and os.path.exists(dest) and os.stat(dest).st_mtime >= src_mtime:
+                    continue
+                if img is None:
+                    img = PILImage.open(src).convert("RGBA")
+                px = size * scale
+                img.resize((px, px), PILImage.Resampling.LANCZOS).save(dest, optimize=True)
+                written.append(dest)
+    return written
+
+
+if __name__ == "__main__":
+    for path in render_assets(force="--force" in sys.argv):
+        print(f"  {os.path.relpath(path, BASE_PATH)}")
@@ -0,0 +1,179 @@
+"""
+skinx: SkinX without the GUI. Every command prints a JSON document on stdout
+and exits with 0 on success, 1 on failure and 2 on bad usage.
+
+    skinx sources
+    skinx branches [--source URL]
+    skinx download BRANCH [--source URL] [--no-select]
+    skinx select PACK
+    skinx matches [--pack PACK]
+    skinx apply (--all | APP [APP ...]) [--pack PACK] [--no-dock-refresh] [--install-fileicon]
+    skinx restore [--no-dock-refresh]
+"""
+import argparse
+import json
+import os
+import sys
+
+from helper import PatcherHelper, merge_branches
+from icon_index import normalize_name
+
+
+class CliError(Exception):
+    def __init__(self, message, code=1, **details):
+        super().__init__(message)
+        self.code = code
+        self.details = details
+
+
+def _app_key(name):
+    return normalize_name(name[:-4] if name.lower().endswith(".app") else name)
+
+
+def cmd_sources(helper, args):
+    return {'sources': helper.list_sources()}
+
+
+def cmd_branches(helper, args):
+    sources = [args.source] if args.source else helper.list_sources()
+    results, errors = {}, []
+    for source in sources:
+        try:
+            results[source] = helper.list_branches(source)
+        except Exception as e:
+            errors.append({'source': source, 'error': str(e)})
+    if errors and not results:
+        raise CliError("no source could be reached", errors=errors)
+    return {'branches': merge_branches(results, sources), 'errors': errors}
+
+
+def cmd_download(helper, args):
+    branch = helper.find_branch(args.branch, args.source)
+    if not branch:
+        raise CliError(f"branch not found: {args.branch}")
+    return helper.download_pack(branch, select=not args.no_select)
+
+
+def cmd_select(helper, args):
+    if args.pack not in helper.installed_packs():
+        raise CliError(f"pack not installed: {args.pack}", installed=helper.installed_packs())
+    helper.select_pack(args.pack)
+    return {'selected_pack': args.pack}
+
+
+def _patches(helper, pack):
+    if pack and pack not in helper.installed_packs():
+        raise CliError(f"pack not installed: {pack}", installed=helper.installed_packs())
+    pack = pack or helper.selected_pack()
+    if not pack:
+        raise CliError("no pack installed, run `skinx download <branch>` first")
+    return pack, helper.get_available_patches(pack)
+
+
+def cmd_matches(helper, args):
+    pack, patches = _patches(helper, args.pack)
+    return {
+        'pack': pack,
+        'matches': [{'app_name': p['app_name'], 'display_name': p['display_name'], 'icon_path': p['icon_path'],
+                     'patched': helper.check_if_patched(p['app_name'])} for p in patches]
+    }
+
+
+def cmd_apply(helper, args):
+    if not args.all and not args.apps:
+        raise CliError("name the apps to patch or pass --all", code=2)
+    pack, patches = _patches(helper, args.pack)
+
+    if args.all:
+        selected = patches
+    else:
+        by_key = {_app_key(p['app_name']): p for p in patches}
+        wanted = [_app_key(a) for a in args.apps]
+        unknown = [a for a, k in zip(args.apps, wanted) if k not in by_key]
+        if unknown:
+            raise CliError("no icon for these apps in the pack", code=2, unknown=unknown, pack=pack)
+        selected = list({k: by_key[k] for k in wanted}.values())
+
+    if not helper.find_fileicon():
+        if not args.install_fileicon:
+            raise CliError("fileicon is not installed, pass --install-fileicon to install it")
+        helper.install_fileicon()
+
+    report = helper.apply_icons(selected, reset_launchpad=not args.no_dock_refresh)
+    result = dict(report.to_dict(), pack=pack)
+    if report.failed:
+        raise CliError(f"{len(report.failed)} icons could not be applied", **result)
+    return result
+
+
+def cmd_restore(helper, args):
+    return {'removed': helper.restore_icons(reset_launchpad=not args.no_dock_refresh)}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="skinx", description="Apply SkinX icon packs from the command line.")
+    parser.add_argument("--root", default="/", help="system root holding System/Applications (default: /)")
+    parser.add_argument("--home", default=None, help="home folder whose Applications receives the icons")
+    parser.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    parser.add_argument("--trace", metavar="PATH", help="record timing spans to PATH (.jsonl, or .json for Chrome trace format)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("sources", help="configured branch sources").set_defaults(func=cmd_sources)
+
+    p = sub.add_parser("branches", help="available packs with their install state")
+    p.add_argument("--source", help="only this branches API url")
+    p.set_defaults(func=cmd_branches)
+
+    p = sub.add_parser("download", help="download or update a pack")
+    p.add_argument("branch")
+    p.add_argument("--source", help="branches API url the pack comes from")
+    p.add_argument("--no-select", action="store_true", help="keep the currently selected pack")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("select", help="choose the pack used by matches/apply")
+    p.add_argument("pack")
+    p.set_defaults(func=cmd_select)
+
+    p = sub.add_parser("matches", help="apps that have an icon in the pack")
+    p.add_argument("--pack", help="installed pack to use instead of the selected one")
+    p.set_defaults(func=cmd_matches)
+
+    p = sub.add_parser("apply", help="apply icons to apps")
+    p.add_argument("apps", nargs="*", help="app names, with or without .app")
+    p.add_argument("--all", action="store_true", help="every app that has an icon in the pack")
+    p.add_argument("--pack", help="installed pack to use instead of the selected one")
+    p.add_argument("--no-dock-refresh", action="store_true", help="do not rebuild Launchpad or restart the Dock")
+    p.add_argument("--install-fileicon", action="store_true", help="install fileicon if it is missing")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("restore", help="remove every applied icon")
+    p.add_argument("--no-dock-refresh", action="store_true", help="do not rebuild Launchpad or restart the Dock")
+    p.set_defaults(func=cmd_restore)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        import tracing
+        tracing.configure(os.path.abspath(args.trace))
+    helper = PatcherHelper(root=args.root, home=args.home)
+    indent = 2 if args.pretty else None
+    try:
+        out, code = dict(args.func(helper, args), ok=True), 0
+    except CliError as e:
+        out, code = dict(e.details, ok=False, error=str(e)), e.code
+    except Exception as e:
+        out, code = {'ok': False, 'error': f"{type(e).__name__}: {e}"}, 1
+    finally:
+        from launchpad import get_refresher
+        # Il riavvio del Dock è ritardato: va eseguito prima di uscire
+        get_refresher(args.root).flush()
+
+    json.dump(out, sys.stdout, indent=indent)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
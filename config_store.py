@@ -0,0 +1,136 @@
+import atexit
+import copy
+import json
+import os
+import threading
+
+from applied_state import write_json_atomic
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_PATH, "config.json")
+DEFAULT_SOURCES = ["https://api.github.com/repos/oxideve/SkinX-icons/branches"]
+
+
+class ConfigStore:
+    """
+    config.json kept in memory. Changes are applied under a lock, so
+    concurrent writers no longer lose each other's updates, and are written
+    to disk atomically once `delay` seconds pass without further changes.
+    """
+
+    def __init__(self, path=CONFIG_PATH, delay=0.3):
+        self.path = path
+        self.delay = delay
+        self._lock = threading.RLock()
+        self._data = None
+        self._timer = None
+        self._dirty = False
+        self._subscribers = []
+
+    def _ensure_loaded(self):
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._data = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._data = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._ensure_loaded()
+            value = self._data.get(key, default)
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def snapshot(self):
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, changes):
+        """ Sets several keys at once; subscribers see a single notification """
+        with self._lock:
+            self._ensure_loaded()
+            changed = {k for k, v in changes.items() if self._data.get(k, object()) != v}
+            for k in changed:
+                self._data[k] = copy.deepcopy(changes[k])
+        self._changed(changed)
+
+    def mutate(self, func):
+        """ Read-modify-write: func(data) edits the dict in place while the lock is held """
+        with self._lock:
+            self._ensure_loaded()
+            before = copy.deepcopy(self._data)
+            func(self._data)
+            changed = {k for k in set(before) | set(self._data) if before.get(k, object()) != self._data.get(k, object())}
+        self._changed(changed)
+
+    def subscribe(self, callback):
+        """ callback(store, changed_keys) runs on the thread that made the change """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _changed(self, keys):
+        if not keys:
+            return
+        with self._lock:
+            self._dirty = True
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(self, frozenset(keys))
+            except Exception:
+                pass
+
+    def flush(self):
+        """ Writes pending changes now """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return False
+            data = copy.deepcopy(self._data)
+            self._dirty = False
+            try:
+                write_json_atomic(self.path, data)
+            except OSError:
+                self._dirty = True
+                return False
+        return True
+
+    def reload(self):
+        """ Drops unsaved state and re-reads the file on next access """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+            self._data = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_config():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore()
+            atexit.register(_store.flush)
+        return _store
@@ -0,0 +1,115 @@
+from icon_index import normalize_name
+
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 24
+BONUS_FIRST_CHAR = 16
+BONUS_CONSECUTIVE = 12
+PENALTY_GAP = 2
+PENALTY_GAP_MAX = 12
+
+
+def _boundaries(original, text):
+    """ Word starts: first char, after a separator, or a camelCase hump """
+    marks = []
+    for i in range(len(text)):
+        if i == 0:
+            marks.append(True)
+            continue
+        prev = original[i - 1] if i - 1 < len(original) else text[i - 1]
+        cur = original[i] if i < len(original) else text[i]
+        marks.append(not prev.isalnum() or (prev.islower() and cur.isupper()))
+    return marks
+
+
+class _Entry:
+    __slots__ = ("text", "boundary", "positions")
+
+    def __init__(self, original):
+        original = original.strip()
+        self.text = normalize_name(original)
+        self.boundary = _boundaries(original, self.text)
+        self.positions = {}
+        for i, ch in enumerate(self.text):
+            self.positions.setdefault(ch, []).append(i)
+
+
+def score_entry(query, entry):
+    """ Best subsequence score of query in entry, None if it does not match """
+    text = entry.text
+    starts = entry.positions.get(query[0])
+    if not starts:
+        return None
+
+    best = None
+    for start in starts[:8]:
+        score = SCORE_MATCH + (BONUS_FIRST_CHAR if start == 0 else 0)
+        score += BONUS_BOUNDARY if entry.boundary[start] else 0
+        pos = start
+        for ch in query[1:]:
+            nxt = text.find(ch, pos + 1)
+            if nxt < 0:
+                score = None
+                break
+            gap = nxt - pos - 1
+            score += SCORE_MATCH
+            if gap == 0:
+                score += BONUS_CONSECUTIVE
+            else:
+                score -= min(PENALTY_GAP_MAX, gap * PENALTY_GAP)
+            if entry.boundary[nxt]:
+                score += BONUS_BOUNDARY
+            pos = nxt
+        if score is None:
+            break
+        if best is None or score > best:
+            best = score
+    return best
+
+
+class FuzzyIndex:
+    """
+    Ranked fuzzy matching over a fixed list of items. Each item can have
+    several names (e.g. bundle name and display name); the best one counts.
+    Consecutive searches that extend the previous query only rescan the
+    previous matches.
+    """
+
+    def __init__(self, names_per_item):
+        self.items = [[_Entry(n) for n in dict.fromkeys(names) if n and n.strip()] for names in names_per_item]
+        self.order = sorted(range(len(self.items)), key=lambda i: self.items[i][0].text if self.items[i] else "")
+        self._last_query = ""
+        self._last_hits = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def _score(self, query, idx):
+        best = None
+        for entry in self.items[idx]:
+            s = score_entry(query, entry)
+            if s is not None and (best is None or s > best):
+                best = s
+        return best
+
+    def search(self, query):
+        """ Indices of matching items, best match first; all items for an empty query """
+        query = normalize_name(query)
+        if not query:
+            self._last_query, self._last_hits = "", None
+            return list(range(len(self.items)))
+
+        if self._last_hits is not None and self._last_query and query.startswith(self._last_query):
+            candidates = self._last_hits
+        else:
+            candidates = self.order
+
+        scored = []
+        for idx in candidates:
+            s = self._score(query, idx)
+            if s is not None:
+                scored.append((s, idx))
+
+        self._last_query = query
+        self._last_hits = [idx for _, idx in scored]
+        scored.sort(key=lambda pair: -pair[0])
+        return [idx for _, idx in scored]
@@ -1,161 +1,376 @@
-import json
 import os
 import subprocess
 import shutil
-import wx
-import requests
 from locales import LM
+from icon_index import get_index, list_packs
+from applied_state import AppliedManifest
+from launchpad import get_refresher
+from config_store import ConfigStore, get_config, DEFAULT_SOURCES
+from tracing import get_tracer
+
+FILEICON_URL = "https://raw.githubusercontent.com/mklement0/fileicon/master/bin/fileicon"
+FILEICON_DEFAULT = "/usr/local/bin/fileicon"
+APPLY_STEPS = 4
+
+
+class ApplyReport:
+    """ Outcome of PatcherHelper.apply_icons """
+
+    def __init__(self, selected, changed, results, dock_refreshed):
+        self.selected = selected
+        self.changed = changed
+        self.results = results
+        self.dock_refreshed = dock_refreshed
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    def to_dict(self):
+        return {
+            'selected': self.selected,
+            'changed': self.changed,
+            'applied': sum(1 for r in self.results if r.ok),
+            'failed': len(self.failed),
+            'dock_refreshed': self.dock_refreshed,
+            'results': [r.to_dict() for r in self.results]
+        }
+
+
+def merge_branches(results, sources):
+    """
+    Branch lists of several sources ({api_url: branches}) as one list. The
+    same repo+branch listed by two sources is kept once (the first source
+    wins); the result is sorted by source order, then branch name.
+    """
+    order = {}
+    for i, url in enumerate(sources):
+        order.setdefault(url, i)
+    rank = lambda url: order.get(url, len(order))
+
+    merged = {}
+    for url in sorted(results, key=rank):
+        for branch in results[url]:
+            key = ((branch.get('repo_api') or branch.get('source') or url).lower(), branch['name'])
+            merged.setdefault(key, (rank(url), branch))
+    ordered = sorted(merged.values(), key=lambda e: (e[0], e[1]['name'].casefold(), e[1]['name']))
+    return [branch for _, branch in ordered]
+
 
 class PatcherHelper:
-    def __init__(self):
-        self.system_apps_path = "/System/Applications"
-        self.user_apps_path = os.path.expanduser("~/Applications")
-        self.base_path = os.path.dirname(os.path.abspath(__file__))
+    """
+    Everything SkinX does, without any UI: the wx windows and the `skinx`
+    command line are both thin layers on top of this class.
+    """
+
+    def __init__(self, injector=None, root="/", home=None, base_path=None, config=None):
+        """
+        root: where System/Applications lives; home: whose ~/Applications gets
+        the shims; base_path: folder holding downloads/, config.json and
+        applied.json (the app folder by default). All three let SkinX run
+        against a synthetic tree.
+        """
+        self.root = root
+        self.system_apps_path = os.path.join(root, "System", "Applications")
+        self.user_apps_path = os.path.join(home or os.path.expanduser("~"), "Applications")
+        self.base_path = base_path or os.path.dirname(os.path.abspath(__file__))
         self.downloads_path = os.path.join(self.base_path, "downloads")
+        self.injector = injector
+        self.last_results = []
+        self.manifest_path = os.path.join(self.base_path, "applied.json")
+        if config is None:
+            config = get_config() if base_path is None else ConfigStore(os.path.join(self.base_path, "config.json"))
+        self.config = config
+        self._http_cache = None
 
     def check_if_patched(self, app_name):
         target = os.path.join(self.user_apps_path, app_name)
         return os.path.exists(os.path.join(target, "Contents"))
 
-    def _refresh_dock(self, dlg=None):
-        if dlg:
-            dlg.Update(4, LM.get("LP_RESET_STATUS"))
-        
-        shell_cmd = 'find /private/var/folders -name "com.apple.dock.launchpad" -exec rm -rf {} +; killall Dock'
-        clean_as_cmd = ['osascript', '-e', f'do shell script {subprocess.list2cmdline([shell_cmd])} with administrator privileges']
-        subprocess.run(clean_as_cmd)
-
-    def ensure_fileicon_installed(self, parent_window):
-        fileicon_bin = shutil.which("fileicon") or "/usr/local/bin/fileicon"
-        if os.path.exists(fileicon_bin):
-            return True
-
-        ask = wx.MessageDialog(parent_window, 
-            LM.get("MSG_FILEICON_MISSING"), 
-            LM.get("TITLE_DEP_MISSING"), wx.YES_NO | wx.ICON_QUESTION)
-        
-        if ask.ShowModal() != wx.ID_YES:
-            return False
-
-        dlg = wx.ProgressDialog(LM.get("TITLE_DEP_INSTALL"), LM.get("STATUS_DL_FILEICON"), maximum=100, parent=parent_window)
-        
+    def refresh_dock(self):
+        get_refresher(self.root).request()
+
+    # --- fileicon ---
+
+    @staticmethod
+    def find_fileicon():
+        fileicon_bin = shutil.which("fileicon") or FILEICON_DEFAULT
+        return fileicon_bin if os.path.exists(fileicon_bin) else None
+
+    def install_fileicon(self, progress=None):
+        """ Installs fileicon via brew or by download (asks for admin rights); progress(percent, key) """
+        report = progress or (lambda percent, key: None)
+        if shutil.which("brew"):
+            report(30, "STATUS_BREW_INSTALL")
+            subprocess.run(["brew", "install", "fileicon"], capture_output=True)
+        else:
+            report(50, "STATUS_MANUAL_DL")
+            from net import get_network
+            response = get_network().get(FILEICON_URL, timeout=10)
+            if response.status_code != 200:
+                raise RuntimeError(LM.get("ERR_DL_FAIL"))
+
+            temp_path = os.path.join(self.base_path, "fileicon_tmp")
+            with open(temp_path, "wb") as f:
+                f.write(response.content)
+
+            report(80, "STATUS_MV_BIN")
+            install_cmd = f"chmod +x {temp_path}; mkdir -p /usr/local/bin; mv {temp_path} {FILEICON_DEFAULT}"
+            as_cmd = 'do shell script "' + install_cmd + '" with administrator privileges'
+            subprocess.run(["osascript", "-e", as_cmd], check=True)
+
+        report(100, "MSG_INSTALL_DONE")
+        path = self.find_fileicon()
+        if not path:
+            raise RuntimeError(LM.get("ERR_DL_FAIL"))
+        return path
+
+    def _get_injector(self):
+        if self.injector:
+            return self.injector
+        workers = self.config.get("inject_workers")
+        from injector import IconInjector
+        return IconInjector(max_workers=workers)
+
+    # --- packs ---
+
+    def list_sources(self):
+        return self.config.get("sources", DEFAULT_SOURCES)
+
+    def installed_packs(self):
+        return list_packs(self.downloads_path)
+
+    def _installed_sha(self, pack):
+        shas = self.config.get("installed_shas", {})
+        return shas.get(pack, "") if isinstance(shas, dict) else ""
+
+    def selected_pack(self):
+        """ The pack chosen by the user, or the first installed one """
+        branches = self.installed_packs()
+        selected = self.config.get("selected_pack")
+        if selected and selected in branches:
+            return selected
+        return branches[0] if branches else None
+
+    def select_pack(self, branch):
+        self.config.set("selected_pack", branch)
+
+    def http_cache(self):
+        if self._http_cache is None:
+            from http_cache import HttpCache, get_http_cache
+            default = self.base_path == os.path.dirname(os.path.abspath(__file__))
+            self._http_cache = get_http_cache() if default else HttpCache(os.path.join(self.downloads_path, ".cache", "http"))
+        return self._http_cache
+
+    def list_branches(self, api_url):
+        """ Branches of a source with their install/update state; raises on network errors """
+        from packs import repo_api_from_source
+
+        parts = api_url.split('/')
+        source = f"{parts[4]}/{parts[5]}" if len(parts) > 5 else api_url
+        response = self.http_cache().get(api_url, timeout=8)
+        response.raise_for_status()
+
+        installed_shas = self.config.get("installed_shas", {})
+        branches = []
+        for b in response.json():
+            name = b.get('name')
+            if not name or name in ['main', 'master']: continue
+
+            sha = b.get('commit', {}).get('sha', "")
+            is_installed = os.path.exists(os.path.join(self.downloads_path, name))
+            branches.append({
+                'name': name,
+                'sha': sha,
+                'source': source,
+                'api_url': api_url,
+                'installed': is_installed,
+                'installed_sha': installed_shas.get(name, ""),
+                'has_update': bool(is_installed and installed_shas.get(name) and installed_shas[name] != sha),
+                'thumb_url': f"https://raw.githubusercontent.com/{source}/{name}/ver.jpg",
+                'download_url': api_url.replace("api.github.com/repos", "github.com").replace("/branches", "") + f"/archive/refs/heads/{name}.zip",
+                'repo_api': repo_api_from_source(api_url)
+            })
+        return branches
+
+    def find_branch(self, name, api_url=None):
+        for source in ([api_url] if api_url else self.list_sources()):
+            for branch in self.list_branches(source):
+                if branch['name'] == name:
+                    return branch
+        return None
+
+    def download_settings(self):
+        from packs import DEFAULT_CHUNK_SIZE, DEFAULT_CONNECTIONS, DEFAULT_RETRIES
+
+        config = self.config
+        settings = {"chunk_size": DEFAULT_CHUNK_SIZE, "connections": DEFAULT_CONNECTIONS, "retries": DEFAULT_RETRIES}
         try:
-            if shutil.which("brew"):
-                dlg.Update(30, LM.get("STATUS_BREW_INSTALL"))
-                subprocess.run(["brew", "install", "fileicon"], capture_output=True)
-            else:
-                dlg.Update(50, LM.get("STATUS_MANUAL_DL"))
-                url = "https://raw.githubusercontent.com/mklement0/fileicon/master/bin/fileicon"
-                response = requests.get(url, timeout=10)
-                
-                if response.status_code == 200:
-                    temp_path = os.path.join(self.base_path, "fileicon_tmp")
-                    with open(temp_path, "wb") as f:
-                        f.write(response.content)
-
-                    dlg.Update(80, LM.get("STATUS_MV_BIN"))
-                    install_cmd = f"chmod +x {temp_path}; mkdir -p /usr/local/bin; mv {temp_path} /usr/local/bin/fileicon"
-                    as_cmd = 'do shell script "' + install_cmd + '" with administrator privileges'
-                    subprocess.run(["osascript", "-e", as_cmd], check=True)
-                else:
-                    raise Exception(LM.get("ERR_DL_FAIL"))
-
-            dlg.Update(100, LM.get("MSG_INSTALL_DONE"))
-            dlg.Destroy()
-            return True
-        except Exception as e:
-            if dlg: dlg.Destroy()
-            wx.MessageBox(f"{LM.get('ERR_GENERAL')}: {str(e)}", LM.get("MENU_SUPPORT"), wx.OK | wx.ICON_ERROR)
-            return False
-
-    def get_available_patches(self):
-        patches = []
-        if not os.path.exists(self.downloads_path):
-            return []
+            settings["chunk_size"] = int(config.get("download_chunk_size", DEFAULT_CHUNK_SIZE))
+            settings["connections"] = int(config.get("download_connections", DEFAULT_CONNECTIONS))
+            settings["retries"] = int(config.get("download_retries", DEFAULT_RETRIES))
+        except: pass
+        return settings
 
-        config_path = os.path.join(self.base_path, "config.json")
-        selected_branch = None
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r') as f:
-                    selected_branch = json.load(f).get("selected_pack")
-            except: pass
+    def download_pack(self, branch, progress=None, select=True):
+        """
+        Installs or updates a branch returned by list_branches. Updates try a
+        tree delta first and fall back to the full archive.
+        progress(stage, done, total) as in packs.install_pack.
+        """
+        from packs import install_pack, delta_update
+        from net import get_network
 
-        branches = [d for d in os.listdir(self.downloads_path) if os.path.isdir(os.path.join(self.downloads_path, d))]
-        if not branches:
-            return []
+        os.makedirs(self.downloads_path, exist_ok=True)
+        name, sha = branch['name'], branch['sha']
+        settings = self.download_settings()
+        old_sha = self._installed_sha(name)
+        mode = "full"
+        tracer = get_tracer()
 
-        if not selected_branch or selected_branch not in branches:
-            selected_branch = branches[0]
+        with tracer.span("download", branch=name, sha=sha) as span:
+            if branch.get('has_update') and branch.get('repo_api') and old_sha:
+                try:
+                    with tracer.span("download.delta", old_sha=old_sha):
+                        delta_update(branch['repo_api'], self.downloads_path, name, old_sha, sha, progress,
+                                     session=get_network(), retries=settings["retries"])
+                    mode = "delta"
+                except Exception as e:
+                    # Aggiornamento incrementale non riuscito: si scarica l'archivio completo
+                    span.set(delta_error=f"{type(e).__name__}: {e}")
+            if mode == "full":
+                install_pack(branch['download_url'], self.downloads_path, name, progress, sha=sha,
+                             session=get_network(), **settings)
+            span.set(mode=mode)
+
+            def record(config):
+                config.setdefault("installed_shas", {})[name] = sha
+                if select: config["selected_pack"] = name
+            self.config.mutate(record)
+        tracer.flush()
+        return {'branch': name, 'sha': sha, 'mode': mode, 'path': os.path.join(self.downloads_path, name)}
+
+    # --- icons ---
+
+    @staticmethod
+    def _bundle_display_name(app_path):
+        import plistlib
+        try:
+            with open(os.path.join(app_path, "Contents", "Info.plist"), 'rb') as f:
+                info = plistlib.load(f)
+            return info.get("CFBundleDisplayName") or info.get("CFBundleName") or ""
+        except Exception:
+            return ""
+
+    def get_available_patches(self, pack=None):
+        patches = []
+        selected_branch = pack or self.selected_pack()
+        if not selected_branch or selected_branch not in self.installed_packs():
+            return []
 
         current_branch_path = os.path.join(self.downloads_path, selected_branch)
-        icon_files = [f for f in os.listdir(current_branch_path) if f.lower().endswith(('.icns', '.png', '.jpg'))]
+        index = get_index(current_branch_path)
+        if not len(index):
+            return []
 
         for app_name in os.listdir(self.system_apps_path):
             if app_name.endswith(".app"):
-                clean_name = app_name.replace(".app", "")
-                match = next((icon for icon in icon_files if icon.lower().startswith(clean_name.lower())), None)
+                match = index.match(app_name)
                 if match:
+                    full_app_path = os.path.join(self.system_apps_path, app_name)
                     patches.append({
                         'app_name': app_name,
-                        'full_app_path': os.path.join(self.system_apps_path, app_name),
-                        'icon_path': os.path.join(current_branch_path, match)
+                        'display_name': self._bundle_display_name(full_app_path),
+                        'full_app_path': full_app_path,
+                        'icon_path': os.path.join(current_branch_path, match),
+                        'icon_hash': index.hashes.get(match),
+                        'pack': selected_branch
                     })
         return patches
 
-    def apply_icons(self, selected_apps, reset_launchpad, parent_window):
-        if not self.ensure_fileicon_installed(parent_window):
-            return
+    def _build_shim(self, app):
+        fake_app_path = os.path.join(self.user_apps_path, app['app_name'])
+        if os.path.lexists(fake_app_path):
+            if os.path.islink(fake_app_path): os.unlink(fake_app_path)
+            else: shutil.rmtree(fake_app_path)
 
-        dlg = wx.ProgressDialog(LM.get("TITLE"), LM.get("STATUS_APPLYING"), maximum=4, parent=parent_window,
-                                 style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_SMOOTH)
+        os.makedirs(fake_app_path)
+        os.symlink(os.path.join(app['full_app_path'], "Contents"), os.path.join(fake_app_path, "Contents"))
 
-        try:
-            dlg.Update(1, LM.get("STATUS_MKDIR"))
-            if not os.path.exists(self.user_apps_path):
-                os.makedirs(self.user_apps_path)
-
-            for app in selected_apps:
-                fake_app_path = os.path.join(self.user_apps_path, app['app_name'])
-                if os.path.exists(fake_app_path):
-                    if os.path.islink(fake_app_path): os.unlink(fake_app_path)
-                    else: shutil.rmtree(fake_app_path)
-                
-                os.makedirs(fake_app_path)
-                os.symlink(os.path.join(app['full_app_path'], "Contents"), os.path.join(fake_app_path, "Contents"))
-
-            dlg.Update(2, LM.get("STATUS_INJECTING"))
-            fileicon_path = shutil.which("fileicon") or "/usr/local/bin/fileicon"
-            for app in selected_apps:
-                dest = os.path.join(self.user_apps_path, app['app_name'])
-                subprocess.run([fileicon_path, "set", dest, app['icon_path']], capture_output=True)
-
-            dlg.Update(3, LM.get("STATUS_CACHE"))
-            wx.MessageBox(LM.get("MSG_RESTART_APPS"), LM.get("TITLE"))
-
-            self._refresh_dock(dlg)
-
-            dlg.Update(4, LM.get("MSG_SUCCESS"))
-            wx.MessageBox(LM.get("MSG_SUCCESS"), LM.get("TITLE"), wx.OK | wx.ICON_INFORMATION)
-
-        except Exception as e:
-            wx.MessageBox(f"{LM.get('ERR_GENERAL')}: {str(e)}", LM.get("MENU_SUPPORT"), wx.OK | wx.ICON_ERROR)
-        finally:
-            if dlg: dlg.Destroy()
-
-    def restore_icons(self, parent_window):
+    def apply_icons(self, selected_apps, reset_launchpad=True, progress=None):
+        """
+        Applies the icons of selected_apps (entries of get_available_patches).
+        Only apps whose icon or shim changed since the last run are touched.
+        progress(step, key) is called with step 1..APPLY_STEPS and a locale key.
+        """
+        report = progress or (lambda step, key: None)
+        self.last_results = []
+        tracer = get_tracer()
+
+        with tracer.span("apply", selected=len(selected_apps)) as span:
+            report(1, "STATUS_MKDIR")
+            with tracer.span("apply.plan"):
+                os.makedirs(self.user_apps_path, exist_ok=True)
+
+                manifest = AppliedManifest(self.manifest_path)
+                shas = {}
+                desired = {}
+                for app in selected_apps:
+                    pack = app.get('pack', "")
+                    if pack not in shas: shas[pack] = self._installed_sha(pack)
+                    desired[app['app_name']] = manifest.build_entry(app, pack, shas[pack], app.get('icon_hash'))
+
+                changes = manifest.diff(desired, self.user_apps_path)
+            span.set(changed=len(changes))
+            if not changes:
+                report(APPLY_STEPS, "MSG_NOTHING_CHANGED")
+                return ApplyReport(len(selected_apps), 0, [], False)
+
+            changed_apps = [app for app in selected_apps if app['app_name'] in changes]
+            span.count("apps_touched", len(changed_apps))
+            with tracer.span("apply.shims") as shims:
+                for app in changed_apps:
+                    if changes[app['app_name']][1]:
+                        self._build_shim(app)
+                        shims.count("shims")
+
+            report(2, "STATUS_INJECTING")
+            jobs = [(app['app_name'], os.path.join(self.user_apps_path, app['app_name']), app['icon_path']) for app in changed_apps]
+            with tracer.span("apply.inject", jobs=len(jobs)):
+                results = self._get_injector().inject(jobs)
+            self.last_results = results
+
+            with tracer.span("apply.manifest"):
+                for r in results:
+                    if r.ok: manifest.record(r.app_name, changes[r.app_name][0])
+                    else: manifest.forget(r.app_name)
+                manifest.save()
+
+            report(3, "STATUS_CACHE")
+            if reset_launchpad:
+                report(APPLY_STEPS, "LP_RESET_STATUS")
+                with tracer.span("apply.dock"):
+                    self.refresh_dock()
+
+        tracer.flush()
+        report(APPLY_STEPS, "MSG_SUCCESS")
+        return ApplyReport(len(selected_apps), len(changes), results, reset_launchpad)
+
+    def restore_icons(self, reset_launchpad=True):
+        """ Removes every SkinX shim from ~/Applications; returns how many were removed """
         count = 0
-        try:
-            if os.path.exists(self.user_apps_path):
-                for item in os.listdir(self.user_apps_path):
-                    item_path = os.path.join(self.user_apps_path, item)
-                    if item.endswith(".app") and os.path.isdir(item_path):
-                        if os.path.islink(os.path.join(item_path, "Contents")):
-                            shutil.rmtree(item_path)
-                            count += 1
-            
-            self._refresh_dock()
-            msg = LM.get("MSG_RESTORE_DONE").replace("{count}", str(count))
-            wx.MessageBox(msg, LM.get("TITLE"), wx.OK | wx.ICON_INFORMATION)
-        except Exception as e:
-            wx.MessageBox(f"{LM.get('ERR_GENERAL')}: {e}", LM.get("MENU_SUPPORT"), wx.ICON_ERROR)
\ No newline at end of file
+        if os.path.exists(self.user_apps_path):
+            for item in os.listdir(self.user_apps_path):
+                item_path = os.path.join(self.user_apps_path, item)
+                if item.endswith(".app") and os.path.isdir(item_path):
+                    if os.path.islink(os.path.join(item_path, "Contents")):
+                        shutil.rmtree(item_path)
+                        count += 1
+
+        manifest = AppliedManifest(self.manifest_path)
+        if manifest.apps:
+            manifest.clear()
+            manifest.save()
+
+        if count and reset_launchpad: self.refresh_dock()
+        return count
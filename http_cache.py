@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from net import get_network
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_PATH, "downloads", ".cache", "http")
+
+
+class CachedResponse:
+    """ The subset of requests.Response used by the callers, backed by the cache """
+
+    def __init__(self, url, status_code, content, headers, from_cache=False, stale=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.stale = stale
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _rate_limited(response):
+    return response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0"
+
+
+class HttpCache:
+    """
+    Disk cache for GET requests that revalidates with If-None-Match /
+    If-Modified-Since. GitHub does not count 304 answers against the rate
+    limit, so unchanged resources are free to re-check.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, session=None):
+        self.cache_dir = cache_dir
+        self.session = session
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            if meta.get("url") != url:
+                return None
+            return meta, body
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta = {"url": url, "etag": etag, "last_modified": last_modified,
+                "content_type": response.headers.get("Content-Type", "")}
+        meta_path, body_path = self._paths(url)
+        try:
+            with self._lock:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._write(body_path, response.content)
+                self._write(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            pass
+
+    def _from_entry(self, url, entry, stale=False):
+        meta, body = entry
+        headers = CaseInsensitiveDict({"ETag": meta.get("etag") or "", "Content-Type": meta.get("content_type", "")})
+        return CachedResponse(url, 200, body, headers, from_cache=True, stale=stale)
+
+    def get(self, url, timeout=10, headers=None):
+        entry = self._load(url)
+        req_headers = dict(headers or {})
+        if entry:
+            meta = entry[0]
+            if meta.get("etag"):
+                req_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                req_headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            r = (self.session or get_network()).get(url, headers=req_headers, timeout=timeout)
+        except requests.RequestException:
+            # Offline: meglio una risposta vecchia che nessuna
+            if entry:
+                return self._from_entry(url, entry, stale=True)
+            raise
+
+        if r.status_code == 304 and entry:
+            return self._from_entry(url, entry)
+        if r.status_code == 200:
+            self._store(url, r)
+            return CachedResponse(url, 200, r.content, r.headers)
+        if entry and _rate_limited(r):
+            return self._from_entry(url, entry, stale=True)
+        return CachedResponse(url, r.status_code, r.content, r.headers)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_http_cache():
+    """ Process-wide cache shared by the update check and the version selector """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpCache()
+        return _shared
@@ -0,0 +1,131 @@
+import struct
+from io import BytesIO
+
+# OSType -> (pixel size, encoding). "png" covers PNG and JPEG 2000 payloads,
+# "rle" the legacy 24-bit PackBits channels that need a separate 8-bit mask.
+ICNS_TYPES = {
+    b"icp4": (16, "png"), b"icp5": (32, "png"), b"icp6": (64, "png"),
+    b"ic04": (16, "png"), b"ic05": (32, "png"),
+    b"ic07": (128, "png"), b"ic08": (256, "png"), b"ic09": (512, "png"),
+    b"ic10": (1024, "png"), b"ic11": (32, "png"), b"ic12": (64, "png"),
+    b"ic13": (256, "png"), b"ic14": (512, "png"),
+    b"is32": (16, "rle"), b"il32": (32, "rle"), b"ih32": (48, "rle"), b"it32": (128, "rle"),
+}
+RLE_MASKS = {b"is32": b"s8mk", b"il32": b"l8mk", b"ih32": b"h8mk", b"it32": b"t8mk"}
+
+_HEADER = struct.Struct(">4sI")
+
+
+class IcnsError(ValueError):
+    pass
+
+
+def read_toc(f):
+    """ {ostype: (offset, length)} of every element, payload offsets excluding the 8 byte header """
+    f.seek(0)
+    head = f.read(_HEADER.size)
+    if len(head) < _HEADER.size:
+        raise IcnsError("truncated icns header")
+    magic, total = _HEADER.unpack(head)
+    if magic != b"icns":
+        raise IcnsError("not an icns file")
+
+    entries = {}
+    offset = _HEADER.size
+    first = f.read(_HEADER.size)
+    if len(first) == _HEADER.size and first[:4] == b"TOC ":
+        # La TOC elenca tipi e lunghezze: gli offset si ricavano senza leggere i dati
+        toc_len = _HEADER.unpack(first)[1]
+        toc = f.read(toc_len - _HEADER.size)
+        offset += toc_len
+        for i in range(0, len(toc) - _HEADER.size + 1, _HEADER.size):
+            ostype, length = _HEADER.unpack_from(toc, i)
+            entries[ostype] = (offset + _HEADER.size, length - _HEADER.size)
+            offset += length
+        return entries
+
+    while offset + _HEADER.size <= total:
+        f.seek(offset)
+        head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            break
+        ostype, length = _HEADER.unpack(head)
+        if length < _HEADER.size:
+            raise IcnsError(f"bad element length for {ostype!r}")
+        entries[ostype] = (offset + _HEADER.size, length - _HEADER.size)
+        offset += length
+    return entries
+
+
+def pick_representation(entries, size):
+    """ Smallest element at least `size` pixels wide, else the largest one """
+    available = [(ICNS_TYPES[t][0], ICNS_TYPES[t][1] != "png", t) for t in entries if t in ICNS_TYPES]
+    available = [a for a in available if a[2] not in RLE_MASKS or RLE_MASKS[a[2]] in entries]
+    if not available:
+        return None
+    big_enough = sorted(a for a in available if a[0] >= size)
+    if big_enough:
+        return big_enough[0][2]
+    return max(available, key=lambda a: (a[0], not a[1]))[2]
+
+
+def unpack_rle(data, pixels, channels=3):
+    """ PackBits variant used by icns: returns `channels` planes of `pixels` bytes each """
+    if len(data) == pixels * channels:
+        return [data[i * pixels:(i + 1) * pixels] for i in range(channels)]
+
+    planes = []
+    pos = 0
+    for _ in range(channels):
+        out = bytearray()
+        while len(out) < pixels:
+            if pos >= len(data):
+                raise IcnsError("truncated RLE data")
+            n = data[pos]
+            pos += 1
+            if n < 0x80:
+                out += data[pos:pos + n + 1]
+                pos += n + 1
+            else:
+                out += data[pos:pos + 1] * (n - 125)
+                pos += 1
+        planes.append(bytes(out[:pixels]))
+    return planes
+
+
+def _read(f, entry):
+    offset, length = entry
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise IcnsError("truncated icns element")
+    return data
+
+
+def open_icns(path, size):
+    """ PIL RGBA image of the representation closest to `size`, or None if there is none """
+    from PIL import Image as PILImage
+
+    with open(path, 'rb') as f:
+        entries = read_toc(f)
+        ostype = pick_representation(entries, size)
+        if ostype is None:
+            return None
+        data = _read(f, entries[ostype])
+        px, kind = ICNS_TYPES[ostype]
+
+        if kind == "png":
+            if data[:4] == b"ARGB":
+                a, r, g, b = unpack_rle(data[4:], px * px, 4)
+                planes = [PILImage.frombytes("L", (px, px), c) for c in (r, g, b, a)]
+                return PILImage.merge("RGBA", planes)
+            img = PILImage.open(BytesIO(data))
+            img.load()
+            return img.convert("RGBA")
+
+        if ostype == b"it32":
+            data = data[4:]
+        r, g, b = unpack_rle(data, px * px, 3)
+        mask = _read(f, entries[RLE_MASKS[ostype]])
+        planes = [PILImage.frombytes("L", (px, px), c) for c in (r, g, b, mask[:px * px])]
+        return PILImage.merge("RGBA", planes)
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import unicodedata
+
+ICON_EXTENSIONS = ('.icns', '.png', '.jpg')
+PACK_MANIFEST = ".skinx-pack.json"
+PACK_MANIFEST_VERSION = 1
+
+# A parità di nome preferiamo il formato nativo macOS
+_EXT_PRIORITY = {ext: i for i, ext in enumerate(ICON_EXTENSIONS)}
+
+
+def normalize_name(name):
+    """ Nome confrontabile: NFC (HFS+/APFS restituiscono NFD) e casefold """
+    return unicodedata.normalize("NFC", name).casefold().strip()
+
+
+def split_icon_name(filename):
+    stem, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if ext not in _EXT_PRIORITY:
+        return None, None
+    return normalize_name(stem), ext
+
+
+class _TrieNode:
+    __slots__ = ("children", "best")
+
+    def __init__(self):
+        self.children = {}
+        self.best = None
+
+
+class IconIndex:
+    """
+    Match index for a single pack.
+    Exact names resolve through a dict; otherwise the trie returns, among the
+    icons starting with the app name, the one covering most of it (shortest
+    stem), so "Mail" prefers "Mail 2.icns" over "Mailbox.icns".
+    """
+
+    def __init__(self, icon_files, hashes=None):
+        self.exact = {}
+        self.root = _TrieNode()
+        self.hashes = hashes or {}
+
+        candidates = {}
+        for filename in icon_files:
+            stem, ext = split_icon_name(filename)
+            if not stem:
+                continue
+            rank = (_EXT_PRIORITY[ext], filename)
+            current = candidates.get(stem)
+            if current is None or rank < current[0]:
+                candidates[stem] = (rank, filename)
+
+        for stem, (_, filename) in candidates.items():
+            self.exact[stem] = filename
+            self._insert(stem, filename)
+
+    def _insert(self, stem, filename):
+        key = (len(stem), stem)
+        node = self.root
+        for ch in stem:
+            node = node.children.setdefault(ch, _TrieNode())
+            self._offer(node, key, filename)
+
+    @staticmethod
+    def _offer(node, key, filename):
+        if node.best is None or key < node.best[0]:
+            node.best = (key, filename)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def match(self, app_name):
+        name = normalize_name(app_name[:-4] if app_name.lower().endswith(".app") else app_name)
+        if not name:
+            return None
+
+        hit = self.exact.get(name)
+        if hit:
+            return hit
+
+        node = self.root
+        for ch in name:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node.best[1] if node.best else None
+
+
+def load_pack_manifest(pack_path):
+    """ Manifest written when the pack was installed, None if missing or unreadable """
+    try:
+        with open(os.path.join(pack_path, PACK_MANIFEST), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") == PACK_MANIFEST_VERSION and isinstance(data.get("icons"), list):
+            return data
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def list_icons(pack_path):
+    """ Icon filenames of a pack, from its manifest or, for older packs, a folder scan """
+    manifest = load_pack_manifest(pack_path)
+    if manifest is not None:
+        return [e["file"] for e in manifest["icons"] if "file" in e]
+    try:
+        return [f for f in os.listdir(pack_path) if split_icon_name(f)[0]]
+    except OSError:
+        return []
+
+
+def list_packs(dl_dir):
+    """ Installed packs (sub folders of downloads, hidden ones excluded), sorted """
+    try:
+        return sorted(d for d in os.listdir(dl_dir) if not d.startswith('.') and os.path.isdir(os.path.join(dl_dir, d)))
+    except OSError:
+        return []
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_index(pack_path):
+    """ Index of pack_path, rebuilt only when the folder mtime changes """
+    try:
+        mtime = os.stat(pack_path).st_mtime_ns
+    except OSError:
+        return IconIndex([])
+
+    with _cache_lock:
+        cached = _cache.get(pack_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    manifest = load_pack_manifest(pack_path)
+    if manifest is not None:
+        icons = [e for e in manifest["icons"] if "file" in e]
+        index = IconIndex([e["file"] for e in icons], {e["file"]: e.get("sha256") for e in icons})
+    else:
+        index = IconIndex(list_icons(pack_path))
+    with _cache_lock:
+        _cache[pack_path] = (mtime, index)
+    return index
@@ -0,0 +1,98 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import get_tracer
+
+
+def default_workers():
+    return max(1, os.cpu_count() or 1)
+
+
+class InjectionResult:
+    def __init__(self, app_name, dest, icon_path, ok, duration, error=""):
+        self.app_name = app_name
+        self.dest = dest
+        self.icon_path = icon_path
+        self.ok = ok
+        self.duration = duration
+        self.error = error
+
+    def to_dict(self):
+        return {
+            'app_name': self.app_name,
+            'dest': self.dest,
+            'icon_path': self.icon_path,
+            'ok': self.ok,
+            'duration': round(self.duration, 4),
+            'error': self.error
+        }
+
+    def __repr__(self):
+        state = "ok" if self.ok else f"failed: {self.error}"
+        return f"<InjectionResult {self.app_name} {state} {self.duration:.3f}s>"
+
+
+class FileiconBackend:
+    """ Runs `fileicon set <dest> <icon>`; any object with set_icon() can replace it """
+
+    def __init__(self, binary=None, timeout=60):
+        self.binary = binary or shutil.which("fileicon") or "/usr/local/bin/fileicon"
+        self.timeout = timeout
+
+    def set_icon(self, dest, icon_path):
+        get_tracer().count("subprocesses")
+        proc = subprocess.run([self.binary, "set", dest, icon_path],
+                              capture_output=True, text=True, timeout=self.timeout)
+        if proc.returncode != 0:
+            raise RuntimeError((proc.stderr or proc.stdout).strip() or f"fileicon exited with {proc.returncode}")
+
+
+class IconInjector:
+    def __init__(self, backend=None, max_workers=None):
+        self.backend = backend or FileiconBackend()
+        self.max_workers = max(1, int(max_workers or default_workers()))
+
+    def _run_one(self, app_name, dest, icon_path):
+        start = time.perf_counter()
+        try:
+            self.backend.set_icon(dest, icon_path)
+            return InjectionResult(app_name, dest, icon_path, True, time.perf_counter() - start)
+        except Exception as e:
+            return InjectionResult(app_name, dest, icon_path, False, time.perf_counter() - start, str(e) or type(e).__name__)
+
+    def inject(self, jobs, on_progress=None):
+        """
+        jobs: iterable of (app_name, dest, icon_path).
+        on_progress(done, total, result) is called from the worker threads.
+        Results are returned in the same order as jobs.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+
+        total = len(jobs)
+        done = [0]
+        lock = threading.Lock()
+        tracer = get_tracer()
+        parent = tracer.current()
+
+        def task(job):
+            with tracer.span("inject.app", parent=parent, app=job[0]) as span:
+                result = self._run_one(*job)
+                if not result.ok: span.count("failed")
+            if on_progress:
+                with lock:
+                    done[0] += 1
+                    count = done[0]
+                on_progress(count, total, result)
+            return result
+
+        workers = min(self.max_workers, total)
+        if workers == 1:
+            return [task(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="skinx-inject") as pool:
+            return list(pool.map(task, jobs))
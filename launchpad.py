@@ -0,0 +1,118 @@
+import glob
+import os
+import shutil
+import subprocess
+import threading
+
+from tracing import get_tracer
+
+LAUNCHPAD_DB = "com.apple.dock.launchpad"
+
+
+class DockRefresher:
+    """
+    Deletes the current user's Launchpad database and restarts the Dock.
+    Requests arriving within `window` seconds share a single Dock restart.
+    """
+
+    def __init__(self, root="/", darwin_user_dir=None, window=1.5, runner=None):
+        self.root = root
+        self.window = window
+        self.runner = runner or (lambda cmd: subprocess.run(cmd, capture_output=True))
+        self._cache_dir = darwin_user_dir
+        self._lock = threading.Lock()
+        self._timer = None
+        self.restarts = 0
+
+    def _query_darwin_user_dir(self):
+        if self.root not in ("/", ""):
+            return None
+        get_tracer().count("subprocesses")
+        try:
+            out = subprocess.run(["getconf", "DARWIN_USER_DIR"], capture_output=True, text=True, timeout=5)
+            path = out.stdout.strip()
+            return path if out.returncode == 0 and path else None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def _scan_user_folders(self):
+        # /private/var/folders/<xx>/<hash>/0 is the per-user DARWIN_USER_DIR
+        uid = os.getuid() if hasattr(os, "getuid") else None
+        pattern = os.path.join(self.root, "private", "var", "folders", "*", "*", "0")
+        for folder in sorted(glob.glob(pattern)):
+            try:
+                if uid is None or os.stat(folder).st_uid == uid:
+                    return folder
+            except OSError:
+                continue
+        return None
+
+    def cache_dir(self):
+        with self._lock:
+            if self._cache_dir is None:
+                self._cache_dir = self._query_darwin_user_dir() or self._scan_user_folders() or ""
+            return self._cache_dir
+
+    def invalidate(self):
+        folder = self.cache_dir()
+        if not folder:
+            return False
+        db = os.path.join(folder, LAUNCHPAD_DB)
+        if os.path.islink(db) or os.path.isfile(db):
+            os.unlink(db)
+        elif os.path.isdir(db):
+            shutil.rmtree(db, ignore_errors=True)
+        else:
+            return False
+        return True
+
+    def restart_dock(self):
+        self.restarts += 1
+        with get_tracer().span("dock.restart") as span:
+            span.count("subprocesses")
+            self.runner(["killall", "Dock"])
+
+    def _fire(self):
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return
+            self._timer = None
+        self.restart_dock()
+
+    def request(self):
+        """ Invalidate now, restart the Dock once the burst of requests is over """
+        with get_tracer().span("dock.invalidate"):
+            self.invalidate()
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.window, self._fire)
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer:
+            timer.cancel()
+            self.restart_dock()
+
+    @property
+    def pending(self):
+        return self._timer is not None
+
+
+_refreshers = {}
+_refreshers_lock = threading.Lock()
+
+
+def set_refresher(refresher):
+    """ Replaces the refresher used for refresher.root, e.g. one with a dummy runner """
+    with _refreshers_lock:
+        _refreshers[refresher.root] = refresher
+
+
+def get_refresher(root="/"):
+    with _refreshers_lock:
+        if root not in _refreshers:
+            _refreshers[root] = DockRefresher(root)
+        return _refreshers[root]
@@ -1,54 +1,231 @@
 import json
+import marshal
 import os
 
+FALLBACK_LANG = "en_us"
+COMPILED_DIR = "compiled"
+COMPILED_INDEX = "index.marshal"
+COMPILED_VERSION = 1
+PRUNE_MIN = 64
+
+def _set_label(widget, text):
+    widget.SetLabel(text)
+
+def _set_title(widget, text):
+    widget.SetTitle(text)
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def lang_info(code, data, fallback):
+    """ Metadata shown in the language list: display name, key count, completion % """
+    translated = sum(1 for k in fallback if data.get(k))
+    return {
+        "code": code,
+        "name": data.get("LANG_NAME") or code.replace("_", " ").upper(),
+        "keys": len(data),
+        "completion": int((translated / len(fallback)) * 100) if fallback else 0,
+    }
+
+def _write_marshal(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        marshal.dump(data, f)
+    os.replace(tmp, path)
+
+def _read_marshal(path):
+    try:
+        with open(path, 'rb') as f:
+            data = marshal.load(f)
+        if isinstance(data, dict) and data.get("version") == COMPILED_VERSION:
+            return data
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    return None
+
+def compile_catalogs(lang_dir, dest_dir=None):
+    """
+    Converts every lang/*.json to marshal, which loads faster than JSON, for
+    bundled builds: one file per language plus an index with the metadata.
+    """
+    dest_dir = dest_dir or os.path.join(lang_dir, COMPILED_DIR)
+    os.makedirs(dest_dir, exist_ok=True)
+    langs = {f[:-5]: _read_json(os.path.join(lang_dir, f)) for f in sorted(os.listdir(lang_dir)) if f.endswith(".json")}
+    fallback = langs.get(FALLBACK_LANG, {})
+    for code, data in langs.items():
+        _write_marshal(os.path.join(dest_dir, f"{code}.marshal"), {"version": COMPILED_VERSION, "catalog": data})
+    meta = {code: lang_info(code, data, fallback) for code, data in langs.items()}
+    _write_marshal(os.path.join(dest_dir, COMPILED_INDEX), {"version": COMPILED_VERSION, "meta": meta})
+    return dest_dir
+
 class LocaleManager:
-    def __init__(self, lang_code="it_it"):
-        self.base_path = os.path.join(os.path.dirname(__file__), "lang")
-        self.en_fallback = {}
-        self.translations = {}
+    def __init__(self, lang_code="it_it", base_path=None):
+        self.base_path = base_path or os.path.join(os.path.dirname(__file__), "lang")
         self.current_lang = lang_code
+        self._catalog = None
+        self._sources = {}
+        self._info = {}
+        self._index = None
+        self._bindings = []
+        self._listeners = []
+        self._prune_at = PRUNE_MIN
+
+    def _path(self, code):
+        return os.path.join(self.base_path, f"{code}.json")
+
+    def _compiled_path(self, name):
+        return os.path.join(self.base_path, COMPILED_DIR, name)
+
+    @staticmethod
+    def _fresh(compiled_stamp, *sources):
+        # Un .json modificato dopo la build ha la precedenza sul file compilato
+        return compiled_stamp is not None and all(s is None or s[0] <= compiled_stamp[0] for s in sources)
 
-        self._load_fallback()
-        self.load_language(lang_code)
+    def _load_index(self):
+        if self._index is None:
+            path = self._compiled_path(COMPILED_INDEX)
+            stamp = _stamp(path)
+            data = _read_marshal(path) if stamp else None
+            self._index = (stamp, data["meta"] if data else {})
+        return self._index
 
-    def _load_fallback(self):
-        path = os.path.join(self.base_path, "en_us.json")
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                self.en_fallback = json.load(f)
+    def _compiled_catalog(self, code, stamp):
+        path = self._compiled_path(f"{code}.marshal")
+        if not self._fresh(_stamp(path), stamp):
+            return None
+        data = _read_marshal(path)
+        return data["catalog"] if data else None
+
+    def _raw(self, code, keep=True):
+        """ Catalog of one language as written in its file, reloaded only when the file changes """
+        stamp = _stamp(self._path(code))
+        cached = self._sources.get(code)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        data = self._compiled_catalog(code, stamp)
+        if data is None:
+            data = _read_json(self._path(code)) if stamp else {}
+        if keep:
+            self._sources[code] = (stamp, data)
+        return data
+
+    @property
+    def en_fallback(self):
+        return self._raw(FALLBACK_LANG)
+
+    @property
+    def translations(self):
+        return self._raw(self.current_lang)
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            # Un solo dizionario: la lingua attiva sopra l'inglese, valori vuoti esclusi
+            catalog = {k: v for k, v in self.en_fallback.items() if v}
+            catalog.update((k, v) for k, v in self.translations.items() if v)
+            self._catalog = catalog
+        return self._catalog
 
     def load_language(self, lang_code):
         self.current_lang = lang_code
-        path = os.path.join(self.base_path, f"{lang_code}.json")
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                self.translations = json.load(f)
+        self._catalog = None
+        # Le altre lingue non servono più in memoria
+        self._sources = {c: v for c, v in self._sources.items() if c in (lang_code, FALLBACK_LANG)}
+        if self._bindings or self._listeners:
+            self.relabel()
 
     def get(self, key):
+        return self.catalog.get(key) or f"MISSING_{key}"
+
+    def bind(self, widget, key, apply=_set_label):
+        """ Shows the translation of `key` on widget now and after every language change """
+        apply(widget, self.get(key))
+        self._bindings.append((widget, key, apply))
+        self._maybe_prune()
+        return widget
+
+    def bind_title(self, window, key):
+        return self.bind(window, key, _set_title)
+
+    def add_listener(self, callback, owner=None):
+        """ callback(lang_code) runs after a language change, until `owner` is destroyed """
+        self._listeners.append((callback, owner))
+        self._maybe_prune()
+
+    def remove_listener(self, callback):
+        self._listeners = [(cb, owner) for cb, owner in self._listeners if cb != callback]
+
+    @staticmethod
+    def _alive(widget):
+        # I widget wx distrutti valgono False
+        try:
+            return widget is None or bool(widget)
+        except RuntimeError:
+            return False
+
+    def _maybe_prune(self):
+        # Le finestre chiuse lasciano voci morte: si eliminano quando le liste raddoppiano
+        if len(self._bindings) + len(self._listeners) < self._prune_at:
+            return
+        self._bindings = [b for b in self._bindings if self._alive(b[0])]
+        self._listeners = [l for l in self._listeners if self._alive(l[1])]
+        self._prune_at = max(PRUNE_MIN, 2 * (len(self._bindings) + len(self._listeners)))
+
+    def relabel(self):
+        bindings = []
+        for widget, key, apply in self._bindings:
+            if not self._alive(widget):
+                continue
+            try:
+                apply(widget, self.get(key))
+            except RuntimeError:
+                continue
+            bindings.append((widget, key, apply))
+        self._bindings = bindings
 
-        val = self.translations.get(key)
-        if val: return val
+        listeners = [(cb, owner) for cb, owner in self._listeners if self._alive(owner)]
+        self._listeners = listeners
+        for callback, _ in listeners:
+            try: callback(self.current_lang)
+            except RuntimeError: pass
 
-        val = self.en_fallback.get(key)
-        if val: return val
+    def get_lang_info(self, lang_code):
+        """ Cached per file: recomputed only when the language or the fallback file changes """
+        stamp = _stamp(self._path(lang_code))
+        key = (stamp, _stamp(self._path(FALLBACK_LANG)))
+        cached = self._info.get(lang_code)
+        if cached and cached[0] == key:
+            return cached[1]
 
-        return f"MISSING_{key}"
+        index_stamp, meta = self._load_index()
+        info = meta.get(lang_code) if self._fresh(index_stamp, *key) else None
+        if info is None:
+            data = self._raw(lang_code, keep=lang_code in (self.current_lang, FALLBACK_LANG))
+            info = lang_info(lang_code, data, self.en_fallback)
+        self._info[lang_code] = (key, info)
+        return info
 
     def get_completion_rate(self, lang_code=None):
-        target_lang = self.translations
-        if lang_code and lang_code != self.current_lang:
-            path = os.path.join(self.base_path, f"{lang_code}.json")
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    target_lang = json.load(f)
-        
-        if not self.en_fallback: return 0
-        
-        total_keys = len(self.en_fallback)
-        translated_keys = sum(1 for k in self.en_fallback if target_lang.get(k))
-        return int((translated_keys / total_keys) * 100)
+        return self.get_lang_info(lang_code or self.current_lang)["completion"]
 
     def get_available_langs(self):
-        return [f.replace(".json", "") for f in os.listdir(self.base_path) if f.endswith(".json")]
+        codes = set(self._load_index()[1])
+        try:
+            codes.update(f[:-5] for f in os.listdir(self.base_path) if f.endswith(".json"))
+        except OSError:
+            pass
+        return sorted(codes)
 
-LM = LocaleManager()
\ No newline at end of file
+LM = LocaleManager()
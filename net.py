@@ -0,0 +1,141 @@
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+
+
+def _default_dispatch(func, *args):
+    """ Runs callbacks on the wx main loop when there is one """
+    try:
+        import wx
+        if wx.GetApp():
+            wx.CallAfter(func, *args)
+            return
+    except ImportError:
+        pass
+    func(*args)
+
+
+def _hold_until_closed(response, slot):
+    """ Releases the host slot of a streamed response when it is closed or garbage collected """
+    release = weakref.finalize(response, slot.release)
+    close = response.close
+
+    def closing():
+        try:
+            close()
+        finally:
+            release()
+
+    response.close = closing
+    return response
+
+
+class NetworkService:
+    """
+    Single entry point for HTTP: one keep-alive Session, a fixed worker pool,
+    at most `per_host` requests in flight per host, and identical concurrent
+    GETs coalesced into one request.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, dispatch=None, session=None):
+        self.per_host = per_host
+        self.dispatch = dispatch or _default_dispatch
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = "SkinX"
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="skinx-net")
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._inflight = {}
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def request(self, method, url, **kwargs):
+        slot = self._host_slot(url)
+        if not kwargs.get("stream"):
+            with slot:
+                return self.session.request(method, url, **kwargs)
+
+        # Con stream=True il corpo arriva dopo: lo slot resta occupato fino alla chiusura
+        slot.acquire()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        return _hold_until_closed(response, slot)
+
+    def get(self, url, headers=None, **kwargs):
+        """ Blocking GET; concurrent identical non-streaming GETs share one response """
+        if kwargs.get("stream") or kwargs.get("params"):
+            return self.request("GET", url, headers=headers, **kwargs)
+
+        key = (url, tuple(sorted((headers or {}).items())))
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            return pending.result()
+
+        try:
+            response = self.request("GET", url, headers=headers, **kwargs)
+            pending.set_result(response)
+            return response
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def call(self, func, *args, on_done=None, on_error=None, **kwargs):
+        """ Runs func on the worker pool; callbacks are dispatched to the UI thread """
+        future = self.executor.submit(func, *args, **kwargs)
+
+        def finished(fut):
+            if fut.cancelled():
+                return
+            exc = fut.exception()
+            if exc is not None:
+                if on_error: self.dispatch(on_error, exc)
+            elif on_done:
+                self.dispatch(on_done, fut.result())
+
+        if on_done or on_error:
+            future.add_done_callback(finished)
+        return future
+
+    def fetch(self, url, on_done=None, on_error=None, **kwargs):
+        return self.call(self.get, url, on_done=on_done, on_error=on_error, **kwargs)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_network():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = NetworkService()
+        return _service
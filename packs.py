@@ -0,0 +1,484 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+from applied_state import write_json_atomic
+from icon_index import PACK_MANIFEST, PACK_MANIFEST_VERSION, load_pack_manifest, split_icon_name
+from tracing import get_tracer
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RETRIES = 4
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 0.1
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ProgressThrottle:
+    """ Forwards (done, total) to callback at most once every `interval` seconds """
+
+    def __init__(self, callback, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, done, total, force=False):
+        if not self.callback:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last < self.interval:
+                return
+            self._last = now
+        self.callback(done, total)
+
+
+class _Counter:
+    def __init__(self, total, throttle):
+        self.total = total
+        self.done = 0
+        self.throttle = throttle
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self.done += n
+            done = self.done
+        self.throttle(done, self.total)
+
+
+def _is_transient(exc):
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500 or exc.response.status_code == 429
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def _with_retries(func, retries, sleep=time.sleep):
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= retries or not _is_transient(e):
+                raise
+            sleep(min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def probe(url, session=None, timeout=15):
+    """ (total_size, accepts_ranges, etag) using a one-byte ranged GET """
+    http = session or requests
+    with http.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout) as r:
+        if r.status_code == 206:
+            content_range = r.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            return (int(total) if total.isdigit() else 0), True, r.headers.get("ETag")
+        r.raise_for_status()
+        return int(r.headers.get("content-length", 0) or 0), False, r.headers.get("ETag")
+
+
+def fetch_range(url, path, start=0, end=None, etag=None, counter=None,
+                chunk_size=DEFAULT_CHUNK_SIZE, session=None, timeout=15):
+    """
+    Fills `path` with bytes start..end (inclusive, None = until EOF), resuming
+    from whatever `path` already holds. Returns the full remote size if known.
+    """
+    http = session or requests
+    tracer = get_tracer()
+    have = _size(path)
+    if end is not None and start + have > end:
+        return
+
+    headers = {}
+    if have or start or end is not None:
+        headers["Range"] = f"bytes={start + have}-{'' if end is None else end}"
+        if etag:
+            headers["If-Range"] = etag
+
+    with http.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416 and end is None and have:
+            return 0
+        total = 0
+        content_range = r.headers.get("Content-Range", "")
+        if r.status_code == 206 and content_range.rsplit("/", 1)[-1].isdigit():
+            total = int(content_range.rsplit("/", 1)[-1])
+        elif r.status_code == 200:
+            total = int(r.headers.get("content-length", 0) or 0)
+        if r.status_code == 200 and headers:
+            if start or end is not None:
+                raise DownloadError("server ignored the Range request")
+            # Niente resume possibile: si riparte da zero
+            if counter: counter.add(-have)
+            have = 0
+        elif r.status_code != 206:
+            r.raise_for_status()
+
+        with open(path, 'ab' if have else 'wb') as f:
+            for chunk in r.iter_content(chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                tracer.count("bytes", len(chunk))
+                if counter: counter.add(len(chunk))
+    return total
+
+
+def _load_state(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path, state):
+    with open(path, 'w') as f:
+        json.dump(state, f)
+
+
+def _remove(*paths):
+    for p in paths:
+        if os.path.exists(p): os.unlink(p)
+
+
+def _discard_partials(dest):
+    folder, prefix = os.path.dirname(dest) or ".", os.path.basename(dest) + ".part"
+    for name in os.listdir(folder):
+        if name.startswith(prefix):
+            _remove(os.path.join(folder, name))
+
+
+def fetch_archive(url, dest, progress=None, chunk_size=DEFAULT_CHUNK_SIZE, connections=DEFAULT_CONNECTIONS,
+                  retries=DEFAULT_RETRIES, tag="", expected_size=None, expected_sha256=None, session=None,
+                  sleep=time.sleep):
+    """
+    Downloads url to dest. Partial data is kept in dest.part (or one
+    dest.part.N per ranged connection) so an interrupted download resumes on
+    the next call with the same url and tag. Large files on servers that
+    support Range are fetched over `connections` parallel requests.
+    """
+    part = dest + ".part"
+    state_path = dest + ".part.json"
+    state = _load_state(state_path)
+    if state.get("url") != url or state.get("tag") != tag:
+        _discard_partials(dest)
+        state = {"url": url, "tag": tag}
+
+    total, ranges, etag = state.get("total", 0), state.get("ranges", False), state.get("etag")
+    if connections > 1 and "ranges" not in state:
+        try:
+            total, ranges, etag = _with_retries(lambda: probe(url, session), retries, sleep)
+        except Exception:
+            total, ranges, etag = 0, False, None
+        state.update(total=total, ranges=ranges, etag=etag)
+
+    segments = 1
+    if ranges and total >= 2 * MIN_SEGMENT_SIZE:
+        segments = max(1, min(connections, total // MIN_SEGMENT_SIZE))
+    if state.get("segments", segments) != segments:
+        for i in range(state["segments"]):
+            _remove(f"{part}.{i}")
+    state["segments"] = segments
+    _save_state(state_path, state)
+
+    try:
+        total = _fetch_parts(url, part, segments, total, etag, progress, chunk_size, retries, session, sleep) or total
+        verify_file(part, expected_size or total or None, expected_sha256)
+    except DownloadError:
+        # Dati parziali non più coerenti con il file remoto: il prossimo tentativo riparte da zero
+        _discard_partials(dest)
+        raise
+    os.replace(part, dest)
+    _remove(state_path)
+    return dest
+
+
+def _fetch_parts(url, part, segments, total, etag, progress, chunk_size, retries, session, sleep):
+    counter = _Counter(total, ProgressThrottle(progress))
+    if segments == 1:
+        counter.done = _size(part)
+        total = _with_retries(lambda: fetch_range(url, part, etag=etag, counter=counter,
+                                                  chunk_size=chunk_size, session=session), retries, sleep) or total
+    else:
+        bounds = [(i * total // segments, (i + 1) * total // segments - 1) for i in range(segments)]
+        counter.done = sum(_size(f"{part}.{i}") for i in range(segments))
+        tracer = get_tracer()
+        parent = tracer.current()
+
+        def run(i):
+            start, end = bounds[i]
+            with tracer.span("fetch.segment", parent=parent, index=i):
+                _with_retries(lambda: fetch_range(url, f"{part}.{i}", start, end, etag, counter,
+                                                  chunk_size, session), retries, sleep)
+
+        with ThreadPoolExecutor(max_workers=segments, thread_name_prefix="skinx-dl") as pool:
+            list(pool.map(run, range(segments)))
+
+        with tracer.span("fetch.join", segments=segments), open(part, 'wb') as out:
+            for i in range(segments):
+                with open(f"{part}.{i}", 'rb') as f:
+                    shutil.copyfileobj(f, out, chunk_size)
+        for i in range(segments):
+            _remove(f"{part}.{i}")
+
+    counter.throttle(counter.done, total, force=True)
+    return total
+
+
+def verify_file(path, expected_size=None, expected_sha256=None):
+    size = _size(path)
+    if expected_size and size != expected_size:
+        _remove(path)
+        raise DownloadError(f"size mismatch: got {size} bytes, expected {expected_size}")
+    if expected_sha256:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        if h.hexdigest() != expected_sha256.lower():
+            _remove(path)
+            raise DownloadError("checksum mismatch")
+
+
+def _swap_into_place(src, dest, dl_dir):
+    old = None
+    if os.path.exists(dest):
+        old = tempfile.mkdtemp(prefix=".old-", dir=dl_dir)
+        os.rmdir(old)
+        os.rename(dest, old)
+    try:
+        os.rename(src, dest)
+    except OSError:
+        if old: os.rename(old, dest)
+        raise
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _hash_icon(path, size, chunk_size=1024 * 1024):
+    """ (sha256, git blob sha) of a file in a single read """
+    digest = hashlib.sha256()
+    blob = hashlib.sha1(b"blob %d\0" % size)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            blob.update(chunk)
+    return digest.hexdigest(), blob.hexdigest()
+
+
+def build_pack_manifest(pack_path, sha="", previous=None):
+    """
+    Describes the icons of a pack. Entries of `previous` whose size and mtime
+    still match are reused, so after a delta update only new files are hashed.
+    """
+    reuse = {e.get("file"): e for e in (previous or {}).get("icons", [])}
+    icons = []
+    for filename in sorted(os.listdir(pack_path)):
+        name, ext = split_icon_name(filename)
+        if not name:
+            continue
+        full = os.path.join(pack_path, filename)
+        st = os.stat(full)
+        if not os.path.isfile(full):
+            continue
+        old = reuse.get(filename)
+        if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+            icons.append(old)
+            continue
+        sha256, blob = _hash_icon(full, st.st_size)
+        icons.append({"file": filename, "name": name, "format": ext[1:], "size": st.st_size,
+                      "mtime_ns": st.st_mtime_ns, "sha256": sha256, "blob": blob})
+    return {"version": PACK_MANIFEST_VERSION, "sha": sha, "created": int(time.time()), "icons": icons}
+
+
+def write_pack_manifest(pack_path, sha="", previous=None):
+    manifest = build_pack_manifest(pack_path, sha, previous)
+    write_json_atomic(os.path.join(pack_path, PACK_MANIFEST), manifest)
+    return manifest
+
+
+def extract_pack(archive_path, dl_dir, branch, sha=""):
+    """ Extracts into a staging folder next to downloads/<branch>, then swaps it in """
+    staging = tempfile.mkdtemp(prefix=f".staging-{branch}-", dir=dl_dir)
+    tracer = get_tracer()
+    try:
+        with tracer.span("extract.unzip") as span, zipfile.ZipFile(archive_path) as z:
+            bad = z.testzip()
+            if bad:
+                raise DownloadError(f"corrupted archive member: {bad}")
+            z.extractall(staging)
+            span.count("files", len(z.infolist()))
+        entries = [e for e in os.listdir(staging) if not e.startswith('__MACOSX')]
+        # Gli archivi GitHub contengono una sola cartella <repo>-<branch>
+        if len(entries) == 1 and os.path.isdir(os.path.join(staging, entries[0])):
+            root = os.path.join(staging, entries[0])
+        else:
+            root = staging
+
+        # Il manifest viaggia con la cartella: compare insieme al pack nello swap
+        with tracer.span("extract.manifest"):
+            write_pack_manifest(root, sha)
+        new_path = os.path.join(dl_dir, branch)
+        with tracer.span("extract.rename"):
+            _swap_into_place(root, new_path, dl_dir)
+        return new_path
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def install_pack(url, dl_dir, branch, progress=None, chunk_size=DEFAULT_CHUNK_SIZE, session=None,
+                 sha="", connections=DEFAULT_CONNECTIONS, retries=DEFAULT_RETRIES):
+    """
+    Downloads the branch archive to disk and installs it as downloads/<branch>.
+    progress(stage, done, total) is throttled; stage is "download" or "extract".
+    A failed download leaves its partial data behind for the next attempt.
+    """
+    os.makedirs(dl_dir, exist_ok=True)
+    archive = os.path.join(dl_dir, f".download-{branch}.zip")
+    on_chunk = (lambda done, total: progress("download", done, total)) if progress else None
+    tracer = get_tracer()
+    with tracer.span("download.fetch", url=url, connections=connections):
+        fetch_archive(url, archive, on_chunk, chunk_size, connections, retries, tag=sha, session=session)
+    try:
+        if progress: progress("extract", 0, 0)
+        with tracer.span("download.extract"):
+            return extract_pack(archive, dl_dir, branch, sha)
+    except zipfile.BadZipFile as e:
+        raise DownloadError(f"invalid archive: {e}")
+    finally:
+        _remove(archive)
+
+
+class DeltaUnavailable(Exception):
+    """ The update cannot be applied as a delta; callers fall back to a full download """
+
+
+DELTA_MAX_RATIO = 0.5
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def repo_api_from_source(api_url):
+    """ https://api.github.com/repos/<owner>/<repo>/branches -> .../repos/<owner>/<repo> """
+    return api_url.rstrip("/").rsplit("/branches", 1)[0]
+
+
+def raw_base_from_repo_api(repo_api):
+    """ https://api.github.com/repos/<owner>/<repo> -> https://raw.githubusercontent.com/<owner>/<repo> """
+    return repo_api.replace("api.github.com/repos/", "raw.githubusercontent.com/", 1)
+
+
+def fetch_tree(repo_api, sha, session=None, timeout=15):
+    http = session or requests
+    r = http.get(f"{repo_api}/git/trees/{sha}", params={"recursive": "1"}, timeout=timeout)
+    r.raise_for_status()
+    data = r.json()
+    if data.get("truncated"):
+        raise DeltaUnavailable("tree listing truncated")
+    return {e["path"]: e["sha"] for e in data.get("tree", []) if e.get("type") == "blob"}
+
+
+def diff_trees(old_tree, new_tree):
+    """ (changed_or_added_paths, removed_paths) """
+    changed = sorted(p for p, sha in new_tree.items() if old_tree.get(p) != sha)
+    removed = sorted(p for p in old_tree if p not in new_tree)
+    return changed, removed
+
+
+def _safe_join(root, rel_path):
+    target = os.path.normpath(os.path.join(root, rel_path))
+    if os.path.isabs(rel_path) or not target.startswith(os.path.abspath(root) + os.sep):
+        raise DeltaUnavailable(f"unsafe path in tree: {rel_path}")
+    return target
+
+
+def delta_update(repo_api, dl_dir, branch, old_sha, new_sha, progress=None, session=None, retries=DEFAULT_RETRIES):
+    """
+    Brings downloads/<branch> from old_sha to new_sha by comparing the two git
+    trees (two API calls) and fetching only the files that changed from
+    raw.githubusercontent.com, which is not rate limited like the API.
+    Raises DeltaUnavailable when a full download is the better option.
+    """
+    pack_path = os.path.abspath(os.path.join(dl_dir, branch))
+    raw_base = raw_base_from_repo_api(repo_api)
+    if not old_sha or not new_sha or not os.path.isdir(pack_path):
+        raise DeltaUnavailable("no installed copy to update")
+    http = session or requests
+    tracer = get_tracer()
+
+    with tracer.span("delta.trees"):
+        old_tree = _with_retries(lambda: fetch_tree(repo_api, old_sha, http), retries)
+        new_tree = _with_retries(lambda: fetch_tree(repo_api, new_sha, http), retries)
+    changed, removed = diff_trees(old_tree, new_tree)
+    # File mancanti o alterati in locale vengono riscaricati insieme alle modifiche
+    manifest = load_pack_manifest(pack_path)
+    local_blobs = {e.get("file"): e.get("blob") for e in manifest["icons"]} if manifest else {}
+    pending = set(changed)
+    for p in new_tree:
+        if p in pending:
+            continue
+        if not os.path.exists(_safe_join(pack_path, p)) or local_blobs.get(p, new_tree[p]) != new_tree[p]:
+            changed.append(p)
+    if new_tree and len(changed) > len(new_tree) * DELTA_MAX_RATIO:
+        raise DeltaUnavailable("too many changed files")
+
+    staging = tempfile.mkdtemp(prefix=f".delta-{branch}-", dir=dl_dir)
+    throttle = ProgressThrottle((lambda done, total: progress("download", done, total)) if progress else None)
+    try:
+        staged = []
+        with tracer.span("delta.blobs", files=len(changed)) as span:
+            for i, rel in enumerate(changed):
+                blob_sha = new_tree[rel]
+
+                # raw.githubusercontent.com non consuma il limite orario delle API
+                def get_blob():
+                    r = http.get(f"{raw_base}/{new_sha}/{quote(rel)}", timeout=15)
+                    r.raise_for_status()
+                    return r.content
+
+                data = _with_retries(get_blob, retries)
+                if git_blob_sha(data) != blob_sha:
+                    raise DeltaUnavailable(f"blob checksum mismatch for {rel}")
+                tmp = os.path.join(staging, str(i))
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                span.count("bytes", len(data))
+                staged.append((tmp, _safe_join(pack_path, rel)))
+                throttle(i + 1, len(changed))
+
+        if progress: progress("extract", 0, 0)
+        with tracer.span("delta.rename"):
+            for tmp, target in staged:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+            for rel in removed:
+                target = _safe_join(pack_path, rel)
+                if os.path.isfile(target): os.unlink(target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    with tracer.span("delta.manifest"):
+        write_pack_manifest(pack_path, new_sha, manifest)
+    return {"changed": len(changed), "removed": len(removed)}
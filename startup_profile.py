@@ -0,0 +1,159 @@
+import builtins
+import json
+import os
+import sys
+import time
+
+ENV_VAR = "SKINX_PROFILE_STARTUP"
+FLAG = "--profile-startup"
+DEFAULT_REPORT = "startup_profile.json"
+
+
+class StartupProfiler:
+    """
+    Records how long startup takes: every module imported for the first time
+    (inclusive time, nested under the import that triggered it), named phases
+    and marks such as the first paint of the main window.
+    """
+
+    def __init__(self, report_path=None):
+        self.report_path = report_path
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self.phases = []
+        self.imports = []
+        self._depth = 0
+        self._original_import = None
+
+    def install(self):
+        if self._original_import is not None:
+            return self
+        self._original_import = original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            depth = self._depth
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth = depth
+                self.imports.append((start - self.t0, depth, name, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+        return self
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.t0))
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def report(self):
+        imports = sorted(self.imports)
+        top_level = [(name, secs) for _, depth, name, secs in imports if depth == 0]
+        return {
+            "total_ms": round((time.perf_counter() - self.t0) * 1000, 2),
+            "marks": [{"name": n, "at_ms": round(t * 1000, 2)} for n, t in self.marks],
+            "phases": [{"name": n, "start_ms": round(s * 1000, 2), "ms": round(d * 1000, 2)} for n, s, d in self.phases],
+            "imports_ms": round(sum(secs for _, secs in top_level) * 1000, 2),
+            "imports": [{"module": name, "depth": depth, "start_ms": round(start * 1000, 2), "ms": round(secs * 1000, 2)}
+                        for start, depth, name, secs in imports],
+        }
+
+    def write_report(self, path=None):
+        """ Writes the JSON report and prints a short summary to stderr """
+        self.uninstall()
+        path = path or self.report_path or DEFAULT_REPORT
+        data = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+
+        slowest = sorted((i for i in data["imports"] if i["depth"] == 0), key=lambda i: -i["ms"])[:10]
+        lines = [f"startup profile -> {path}", f"  total {data['total_ms']} ms, imports {data['imports_ms']} ms"]
+        lines += [f"  {m['name']:<24} at {m['at_ms']} ms" for m in data["marks"]]
+        lines += [f"  {p['name']:<24} {p['ms']} ms" for p in data["phases"]]
+        lines += [f"  import {i['module']:<17} {i['ms']} ms" for i in slowest]
+        print("\n".join(lines), file=sys.stderr)
+        return path
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        p = self.profiler
+        p.phases.append((self.name, self.start - p.t0, time.perf_counter() - self.start))
+        return False
+
+
+class _NullProfiler:
+    """ Used when profiling is off: every call is a no-op """
+
+    def mark(self, name):
+        pass
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def write_report(self, path=None):
+        return None
+
+    def __bool__(self):
+        return False
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+_profiler = _NullProfiler()
+
+
+def start_from_args(argv=None, environ=None):
+    """
+    Enables profiling for `--profile-startup[=path]` or SKINX_PROFILE_STARTUP=1|path.
+    The flag is removed from argv so the rest of the app never sees it.
+    """
+    global _profiler
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+
+    report_path = None
+    enabled = False
+    for arg in list(argv[1:]):
+        if arg == FLAG or arg.startswith(FLAG + "="):
+            enabled = True
+            report_path = arg.partition("=")[2] or None
+            argv.remove(arg)
+    value = environ.get(ENV_VAR, "")
+    if value and value != "0":
+        enabled = True
+        if value != "1":
+            report_path = report_path or value
+
+    if enabled and not isinstance(_profiler, StartupProfiler):
+        _profiler = StartupProfiler(report_path).install()
+    return _profiler
+
+
+def get_profiler():
+    return _profiler
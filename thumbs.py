@@ -0,0 +1,292 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+from icns import IcnsError, open_icns
+
+THUMB_SIZE = 64
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MAGIC = b"SKT1"
+_HEADER = struct.Struct("<4sHH")
+
+
+def decode_thumbnail(path, size=THUMB_SIZE):
+    """ Returns (width, height, rgba_bytes) of `path` (a file path or file object) scaled to size x size """
+    from PIL import Image as PILImage
+
+    if isinstance(path, str) and path.lower().endswith(".icns"):
+        # Decodifica solo la rappresentazione più vicina invece della 1024px
+        try:
+            img = open_icns(path, size)
+        except (IcnsError, OSError, ValueError, SyntaxError):
+            img = None
+        if img is not None:
+            if img.size != (size, size):
+                img = img.resize((size, size), PILImage.Resampling.LANCZOS)
+            return size, size, img.tobytes()
+
+    with PILImage.open(path) as img:
+        img = img.convert("RGBA").resize((size, size), PILImage.Resampling.LANCZOS)
+        return size, size, img.tobytes()
+
+
+class ThumbnailCache:
+    """
+    Disk cache of RGBA thumbnails, one zlib-compressed file per key.
+    File mtime is used as last-access time for LRU eviction.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def key_for(path, size=THUMB_SIZE):
+        st = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".thumb")
+
+    def get(self, key):
+        file_path = self._path(key)
+        try:
+            with open(file_path, 'rb') as f:
+                blob = f.read()
+            magic, w, h = _HEADER.unpack_from(blob)
+            if magic != _MAGIC:
+                return None
+            rgba = zlib.decompress(blob[_HEADER.size:])
+            if len(rgba) != w * h * 4:
+                return None
+            os.utime(file_path)
+            return w, h, rgba
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+
+    def put(self, key, w, h, rgba):
+        file_path = self._path(key)
+        folder = os.path.dirname(file_path)
+        blob = _HEADER.pack(_MAGIC, w, h) + zlib.compress(rgba, 6)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += len(blob)
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".thumb"):
+                    try:
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                    except OSError:
+                        pass
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target=None):
+        """ Drops least recently used thumbnails until the cache is under target """
+        target = self.max_bytes * 0.8 if target is None else target
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, file_path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(file_path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total = total
+
+    def load(self, path, size=THUMB_SIZE):
+        """ Cached thumbnail of path, decoding and storing it on a miss """
+        try:
+            key = self.key_for(path, size)
+        except OSError:
+            return None
+        hit = self.get(key)
+        if hit:
+            return hit
+        w, h, rgba = decode_thumbnail(path, size)
+        self.put(key, w, h, rgba)
+        return w, h, rgba
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    """ Process pool shared by every loader, so PIL decoding runs outside the GIL """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _pool = ProcessPoolExecutor(max_workers=max(1, min(8, os.cpu_count() or 1)))
+        return _pool
+
+
+def shutdown_decode_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class ThumbnailLoader:
+    """
+    Streams thumbnails for a list of paths: cache hits first, then misses
+    decoded on the process pool. deliver(index, w, h, rgba) is called from
+    the loader thread; GUI callers wrap it with wx.CallAfter.
+    """
+
+    def __init__(self, cache, paths, deliver, size=THUMB_SIZE, pool=None):
+        self.cache = cache
+        self.paths = list(paths)
+        self.deliver = deliver
+        self.size = size
+        self.pool = pool
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(range(len(self.paths)))
+        self._priority = []
+        self._thread = None
+
+    def start(self, priority=()):
+        self.prioritize(priority)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def prioritize(self, indices):
+        with self._lock:
+            self._priority = list(indices)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def join(self, timeout=None):
+        """ Waits until every thumbnail has been delivered (or the loader was cancelled) """
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _next(self):
+        with self._lock:
+            while self._priority:
+                idx = self._priority.pop(0)
+                if idx in self._pending:
+                    del self._pending[idx]
+                    return idx
+            if self._pending:
+                idx = next(iter(self._pending))
+                del self._pending[idx]
+                return idx
+        return None
+
+    def _emit(self, idx, thumb):
+        if thumb and not self.cancelled.is_set():
+            self.deliver(idx, *thumb)
+
+    def _run(self):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from concurrent.futures.process import BrokenProcessPool
+
+        with self._lock:
+            order = list(dict.fromkeys(i for i in self._priority if i in self._pending))
+        first = set(order)
+        order += [i for i in range(len(self.paths)) if i not in first]
+
+        misses = {}
+        for idx in order:
+            if self.cancelled.is_set():
+                return
+            try:
+                key = ThumbnailCache.key_for(self.paths[idx], self.size)
+            except OSError:
+                continue
+            hit = self.cache.get(key)
+            if hit:
+                self._emit(idx, hit)
+            else:
+                misses[idx] = key
+
+        with self._lock:
+            self._pending = dict.fromkeys(misses)
+        pool = self.pool or get_decode_pool()
+        limit = max(2, (getattr(pool, "_max_workers", 0) or 1) * 2)
+        inflight = {}
+
+        while not self.cancelled.is_set():
+            while len(inflight) < limit:
+                idx = self._next()
+                if idx is None:
+                    break
+                try:
+                    fut = pool.submit(decode_thumbnail, self.paths[idx], self.size)
+                except (BrokenProcessPool, RuntimeError):
+                    fut = None
+                if fut is None:
+                    self._decode_inline(idx, misses[idx])
+                else:
+                    inflight[fut] = idx
+            if not inflight:
+                break
+
+            done, _ = wait(list(inflight), timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx = inflight.pop(fut)
+                try:
+                    thumb = fut.result()
+                except BrokenProcessPool:
+                    self._decode_inline(idx, misses[idx])
+                    continue
+                except Exception:
+                    continue
+                self.cache.put(misses[idx], *thumb)
+                self._emit(idx, thumb)
+
+        for fut in inflight:
+            fut.cancel()
+
+    def _decode_inline(self, idx, key):
+        try:
+            thumb = decode_thumbnail(self.paths[idx], self.size)
+        except Exception:
+            return
+        self.cache.put(key, *thumb)
+        self._emit(idx, thumb)
@@ -0,0 +1,253 @@
+"""
+Lightweight tracing for slow applies and downloads in the field.
+
+    with get_tracer().span("apply", apps=12) as span:
+        ...
+        span.count("bytes", len(chunk))
+
+Spans nest per thread and record wall time, CPU time of their thread and
+counters; a child's counters are added to its parent when it ends. Spans
+are written as JSON lines (*.jsonl) or in Chrome trace format (*.json, open
+it in chrome://tracing or Perfetto).
+
+Tracing is off unless SKINX_TRACE is set (1 or an output path) or the
+"trace" setting is on; when off every call hits a shared no-op object.
+"""
+import atexit
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+ENV_VAR = "SKINX_TRACE"
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TRACE = os.path.join(BASE_PATH, "skinx_trace.jsonl")
+CHROME_MAX_SPANS = 100000
+
+
+class Span:
+    __slots__ = ("tracer", "id", "parent", "name", "attrs", "counters", "thread",
+                 "start", "cpu_start", "wall", "cpu")
+
+    def __init__(self, tracer, name, parent, attrs):
+        self.tracer = tracer
+        self.id = next(tracer._ids)
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+        self.thread = threading.get_ident()
+        self.start = self.cpu_start = 0.0
+        self.wall = self.cpu = None
+
+    def __enter__(self):
+        self.tracer._push(self)
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self.start
+        self.cpu = time.thread_time() - self.cpu_start
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._pop(self)
+        return False
+
+    def count(self, key, n=1):
+        with self.tracer._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, t0):
+        return {
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent.id if self.parent else None,
+            "thread": self.thread,
+            "start_ms": round((self.start - t0) * 1000, 3),
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "attrs": self.attrs,
+            "counters": self.counters,
+        }
+
+
+class Tracer:
+    def __init__(self, path=DEFAULT_TRACE, max_spans=CHROME_MAX_SPANS):
+        self.path = path
+        self.max_spans = max_spans
+        self.t0 = time.perf_counter()
+        self.spans = collections.deque(maxlen=max_spans if path and path.endswith(".json") else None)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, span):
+        self._stack().append(span)
+
+    def _pop(self, span):
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        with self._lock:
+            self.spans.append(span)
+            if span.parent:
+                for key, n in span.counters.items():
+                    span.parent.counters[key] = span.parent.counters.get(key, 0) + n
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def span(self, name, parent=None, **attrs):
+        """ parent defaults to the innermost open span of this thread; pass it for work handed to other threads """
+        return Span(self, name, parent or self.current(), attrs)
+
+    def count(self, key, n=1):
+        """ Adds to a counter of the innermost open span of this thread """
+        span = self.current()
+        if span is not None:
+            span.count(key, n)
+
+    def records(self):
+        with self._lock:
+            return [s.to_dict(self.t0) for s in self.spans]
+
+    def export_jsonl(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.records():
+                f.write(json.dumps(record) + "\n")
+        return path
+
+    def export_chrome(self, path):
+        pid = os.getpid()
+        events = [{
+            "name": r["name"], "cat": "skinx", "ph": "X", "pid": pid, "tid": r["thread"],
+            "ts": round(r["start_ms"] * 1000, 1), "dur": round(r["wall_ms"] * 1000, 1),
+            "args": dict(r["attrs"], cpu_ms=r["cpu_ms"], **r["counters"])
+        } for r in self.records()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def flush(self):
+        """
+        Writes the spans to self.path. JSON lines are appended and dropped from
+        memory; Chrome format (.json) rewrites the file with the last max_spans spans.
+        """
+        if not self.path:
+            return None
+        if self.path.endswith(".json"):
+            return self.export_chrome(self.path)
+        with self._lock:
+            new = list(self.spans)
+            self.spans.clear()
+        if new:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for span in new:
+                    f.write(json.dumps(span.to_dict(self.t0)) + "\n")
+        return self.path
+
+    def __bool__(self):
+        return True
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, key, n=1):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+class _NullTracer:
+    """ Used when tracing is off: every call is a no-op """
+
+    def span(self, name, parent=None, **attrs):
+        return _NULL_SPAN
+
+    def count(self, key, n=1):
+        pass
+
+    def current(self):
+        return None
+
+    def flush(self):
+        return None
+
+    def __bool__(self):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_NULL_TRACER = _NullTracer()
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _trace_path(environ, config):
+    value = environ.get(ENV_VAR, "")
+    if value and value != "0":
+        return DEFAULT_TRACE if value == "1" else value
+    if config is not None and config.get("trace"):
+        return config.get("trace_path") or DEFAULT_TRACE
+    return None
+
+
+def configure(path=None, environ=None, config=None):
+    """
+    Turns tracing on (writing to `path`) or off. Without a path the choice
+    comes from SKINX_TRACE and the "trace"/"trace_path" settings.
+    """
+    global _tracer
+    if path is None:
+        if config is None:
+            from config_store import get_config
+            config = get_config()
+        path = _trace_path(os.environ if environ is None else environ, config)
+
+    with _tracer_lock:
+        old = _tracer
+        if path and isinstance(old, Tracer) and old.path == path:
+            return old
+        _tracer = Tracer(path) if path else _NULL_TRACER
+    if old:
+        old.flush()
+    return _tracer
+
+
+def _on_config_changed(store, changed):
+    if {"trace", "trace_path"} & set(changed):
+        configure(config=store)
+
+
+def get_tracer():
+    if _tracer is None:
+        from config_store import get_config
+        config = get_config()
+        configure(config=config)
+        config.subscribe(_on_config_changed)
+    return _tracer
+
+
+@atexit.register
+def _flush_at_exit():
+    if _tracer:
+        _tracer.flush()
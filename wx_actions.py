@@ -0,0 +1,67 @@
+import wx
+from locales import LM
+from helper import APPLY_STEPS
+
+def _show_error(e):
+    wx.MessageBox(f"{LM.get('ERR_GENERAL')}: {str(e)}", LM.get("MENU_SUPPORT"), wx.OK | wx.ICON_ERROR)
+
+def ensure_fileicon_installed(helper, parent_window):
+    if helper.find_fileicon():
+        return True
+
+    ask = wx.MessageDialog(parent_window,
+        LM.get("MSG_FILEICON_MISSING"),
+        LM.get("TITLE_DEP_MISSING"), wx.YES_NO | wx.ICON_QUESTION)
+    if ask.ShowModal() != wx.ID_YES:
+        return False
+
+    dlg = wx.ProgressDialog(LM.get("TITLE_DEP_INSTALL"), LM.get("STATUS_DL_FILEICON"), maximum=100, parent=parent_window)
+    try:
+        helper.install_fileicon(lambda percent, key: dlg.Update(percent, LM.get(key)))
+        return True
+    except Exception as e:
+        _show_error(e)
+        return False
+    finally:
+        dlg.Destroy()
+
+def apply_icons(helper, selected_apps, reset_launchpad, parent_window):
+    if not ensure_fileicon_installed(helper, parent_window):
+        return None
+
+    dlg = wx.ProgressDialog(LM.get("TITLE"), LM.get("STATUS_APPLYING"), maximum=APPLY_STEPS, parent=parent_window,
+                             style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_SMOOTH)
+
+    def progress(step, key):
+        dlg.Update(step, LM.get(key))
+        if key == "STATUS_CACHE":
+            wx.MessageBox(LM.get("MSG_RESTART_APPS"), LM.get("TITLE"))
+
+    try:
+        report = helper.apply_icons(selected_apps, reset_launchpad, progress)
+    except Exception as e:
+        _show_error(e)
+        return None
+    finally:
+        dlg.Destroy()
+
+    if not report.changed:
+        wx.MessageBox(LM.get("MSG_NOTHING_CHANGED"), LM.get("TITLE"), wx.OK | wx.ICON_INFORMATION)
+        return report
+
+    if report.failed:
+        details = "\n".join(f"{r.app_name}: {r.error}" for r in report.failed)
+        wx.MessageBox(LM.get("MSG_INJECT_FAILED").replace("{count}", str(len(report.failed))) + "\n\n" + details,
+                      LM.get("TITLE"), wx.OK | wx.ICON_WARNING)
+    wx.MessageBox(LM.get("MSG_SUCCESS"), LM.get("TITLE"), wx.OK | wx.ICON_INFORMATION)
+    return report
+
+def restore_icons(helper, parent_window):
+    try:
+        count = helper.restore_icons()
+        msg = LM.get("MSG_RESTORE_DONE").replace("{count}", str(count))
+        wx.MessageBox(msg, LM.get("TITLE"), wx.OK | wx.ICON_INFORMATION)
+        return count
+    except Exception as e:
+        _show_error(e)
+        return None
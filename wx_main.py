@@ -0,0 +1,417 @@
+import sys  # Necessario per resource_path
+import startup_profile
+# Avviato da main.py prima di importare questo modulo
+PROFILE = startup_profile.get_profiler()
+
+import wx
+import os
+from data import Data
+from helper import PatcherHelper
+from wx_actions import apply_icons, restore_icons
+from locales import LM 
+from thumbs import ThumbnailCache, ThumbnailLoader, THUMB_SIZE
+from app_model import RowModel
+from fuzzy import FuzzyIndex
+from config_store import get_config, DEFAULT_SOURCES
+from bitmaps import MENU_ICON_SIZE, get_bitmap
+
+SEARCH_DELAY_MS = 150
+# I controlli di rete partono dopo il primo disegno della finestra
+UPDATE_CHECK_DELAY_MS = 300
+UPDATE_CHECK_FALLBACK_MS = 2000
+
+def resource_path(relative_path):
+    """ Ottiene il percorso assoluto delle risorse, compatibile con PyInstaller """
+    try:
+        # PyInstaller crea una cartella temporanea e memorizza il percorso in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+class AppListBox(wx.VListBox):
+    """ Draws only the rows on screen; all state lives in the RowModel """
+    ROW_HEIGHT = THUMB_SIZE + 14
+
+    def __init__(self, parent, model, bitmaps, placeholder):
+        super().__init__(parent, style=wx.BORDER_SUNKEN)
+        self.model = model
+        self.bitmaps = bitmaps
+        self.placeholder = placeholder
+        self.installed_suffix = f" ({LM.get('LBL_INSTALLED')})"
+        LM.add_listener(self._on_language_changed, self)
+        self.font = wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_MEDIUM, faceName=".AppleSystemUIFont")
+        self.SetBackgroundColour(wx.Colour(255, 255, 255))
+        self.SetItemCount(len(model))
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_click)
+        self.Bind(wx.EVT_KEY_DOWN, self.on_key)
+
+    def _on_language_changed(self, lang):
+        self.installed_suffix = f" ({LM.get('LBL_INSTALLED')})"
+        self.Refresh()
+
+    def OnMeasureItem(self, n):
+        return self.ROW_HEIGHT
+
+    def OnDrawBackground(self, dc, rect, n):
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.SetBrush(wx.Brush(wx.Colour(232, 240, 254) if self.IsSelected(n) else wx.Colour(255, 255, 255)))
+        dc.DrawRectangle(rect)
+        dc.SetPen(wx.Pen(wx.Colour(225, 225, 228)))
+        dc.DrawLine(rect.x, rect.GetBottom(), rect.GetRight(), rect.GetBottom())
+
+    def OnDrawItem(self, dc, rect, n):
+        idx = self.model.index_at(n)
+        patched = self.model.patched[idx]
+
+        cb_rect = wx.Rect(rect.x + 10, rect.y + (rect.height - 16) // 2, 16, 16)
+        flags = wx.CONTROL_CHECKED if self.model.checked[idx] else 0
+        wx.RendererNative.Get().DrawCheckBox(self, dc, cb_rect, flags)
+
+        thumb = self.model.thumb[idx]
+        bmp = self.bitmaps[thumb] if thumb >= 0 else self.placeholder
+        dc.DrawBitmap(bmp, rect.x + 41, rect.y + (rect.height - THUMB_SIZE) // 2, True)
+
+        label = self.model.names[idx] + (self.installed_suffix if patched else "")
+        dc.SetFont(self.font)
+        dc.SetTextForeground(wx.Colour(120, 120, 120) if patched else wx.Colour(0, 0, 0))
+        tw, th = dc.GetTextExtent(label)
+        dc.DrawText(label, rect.x + 55 + THUMB_SIZE, rect.y + (rect.height - th) // 2)
+
+    def toggle_row(self, n):
+        if 0 <= n < len(self.model):
+            self.model.toggle(self.model.index_at(n))
+            self.RefreshRow(n)
+
+    def on_click(self, event):
+        self.toggle_row(self.HitTest(event.GetPosition()))
+        event.Skip()
+
+    def on_key(self, event):
+        if event.GetKeyCode() == wx.WXK_SPACE:
+            self.toggle_row(self.GetSelection())
+        else:
+            event.Skip()
+
+    def visible_indices(self):
+        first, last = self.GetVisibleRowsBegin(), min(self.GetVisibleRowsEnd(), len(self.model))
+        return [self.model.index_at(n) for n in range(first, last)]
+
+    def sync(self):
+        self.SetItemCount(len(self.model))
+        self.Refresh()
+
+class IconSelectorDialog(wx.Dialog):
+    def __init__(self, parent, available_patches):
+        super().__init__(parent, title=LM.get("TITLE"), size=(750, 600),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        LM.bind_title(self, "TITLE")
+        
+        self.available = available_patches
+        self.helper = PatcherHelper()
+        self.thumbs = ThumbnailCache(os.path.join(self.helper.downloads_path, ".thumbs"))
+        self.placeholder = wx.Bitmap.FromRGBA(THUMB_SIZE, THUMB_SIZE, 235, 235, 237, 255)
+        self.bitmaps = []
+        self.model = RowModel.from_patches(self.available, self.helper.check_if_patched)
+        self.search_index = FuzzyIndex([(item['app_name'][:-4] if item['app_name'].endswith(".app") else item['app_name'],
+                                         item.get('display_name', "")) for item in self.available])
+        self.search_timer = None
+        self.SetBackgroundColour(wx.Colour(245, 245, 247))
+        
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+        header = LM.bind(wx.StaticText(self), "DLG_SELECT_ICONS")
+        header.SetFont(wx.Font(14, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD, faceName=".AppleSystemUIFont"))
+        main_sizer.Add(header, 0, wx.ALL | wx.CENTER, 15)
+
+        self.search = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER)
+        self.search.SetHint("Search apps...")
+        self.search.Bind(wx.EVT_TEXT, self.on_search)
+        main_sizer.Add(self.search, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 15)
+
+        self.list = AppListBox(self, self.model, self.bitmaps, self.placeholder)
+        main_sizer.Add(self.list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 15)
+
+        ctrl_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        btn_all = LM.bind(wx.Button(self), "DLG_BTN_ALL")
+        btn_none = LM.bind(wx.Button(self), "DLG_BTN_NONE")
+        btn_all.Bind(wx.EVT_BUTTON, self.on_select_all)
+        btn_none.Bind(wx.EVT_BUTTON, self.on_deselect_all)
+        
+        ctrl_sizer.Add(btn_all, 1, wx.ALL, 5)
+        ctrl_sizer.Add(btn_none, 1, wx.ALL, 5)
+        main_sizer.Add(ctrl_sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+
+        main_sizer.Add(self.CreateButtonSizer(wx.OK | wx.CANCEL), 0, wx.ALIGN_CENTER | wx.ALL, 15)
+        self.SetSizer(main_sizer)
+
+        self.list.Bind(wx.EVT_SCROLLWIN, self.on_scroll)
+        self.list.Bind(wx.EVT_SIZE, self.on_scroll)
+        deliver = lambda idx, w, h, rgba: wx.CallAfter(self._set_thumb, idx, w, h, rgba)
+        self.loader = ThumbnailLoader(self.thumbs, [item['icon_path'] for item in self.available], deliver, THUMB_SIZE)
+        self.loader.start(priority=range(min(len(self.available), 12)))
+
+    def on_scroll(self, event):
+        event.Skip()
+        wx.CallAfter(self._prioritize_visible)
+
+    def _prioritize_visible(self):
+        if self and not self.loader.cancelled.is_set():
+            self.loader.prioritize(self.list.visible_indices())
+
+    def _set_thumb(self, idx, w, h, rgba):
+        if not self or self.loader.cancelled.is_set():
+            return
+        self.model.thumb[idx] = len(self.bitmaps)
+        self.bitmaps.append(wx.Bitmap.FromBufferRGBA(w, h, rgba))
+        first, last = self.list.GetVisibleRowsBegin(), self.list.GetVisibleRowsEnd()
+        for n in range(first, min(last + 1, len(self.model))):
+            if self.model.index_at(n) == idx:
+                self.list.RefreshRow(n)
+                break
+
+    def ShowModal(self):
+        result = super().ShowModal()
+        self.loader.cancel()
+        return result
+
+    def Destroy(self):
+        self.loader.cancel()
+        return super().Destroy()
+
+    def on_search(self, event):
+        # Debounce: si filtra una sola volta quando l'utente smette di digitare
+        if self.search_timer and self.search_timer.IsRunning():
+            self.search_timer.Restart(SEARCH_DELAY_MS)
+        else:
+            self.search_timer = wx.CallLater(SEARCH_DELAY_MS, self._apply_search)
+
+    def _apply_search(self):
+        if not self:
+            return
+        self.model.set_visible(self.search_index.search(self.search.GetValue()))
+        self.list.sync()
+        self.list.ScrollToRow(0)
+        self._prioritize_visible()
+
+    def on_select_all(self, event):
+        self.model.set_visible_checked(True)
+        self.list.Refresh()
+
+    def on_deselect_all(self, event):
+        self.model.set_visible_checked(False)
+        self.list.Refresh()
+
+    def GetSelectedItems(self):
+        return [self.available[i] for i in self.model.selected()]
+
+class MainFrame(wx.Frame):
+    def __init__(self, parent):
+        self.constants = Data()
+        # Il config rimane fuori dal bundle per poter essere scritto
+        self.config = get_config()
+        with PROFILE.phase("load_language"):
+            self._load_saved_language()
+        
+        full_title = f"SkinX v{self.constants.patcher_version} ({self.constants.patcher_subversion})"
+        super(MainFrame, self).__init__(parent, title=full_title, size=(650, 420), 
+                                        style=wx.DEFAULT_FRAME_STYLE & ~(wx.RESIZE_BORDER | wx.MAXIMIZE_BOX))
+        
+        # Imposta l'icona dell'app nel dock/finestra
+        icon_path = resource_path("assets/icon.icns")
+        if os.path.exists(icon_path):
+            self.SetIcon(wx.Icon(icon_path, wx.BITMAP_TYPE_ICON))
+
+        self.helper = PatcherHelper()
+        self.font_model = wx.Font(13, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL, faceName=".AppleSystemUIFont")
+        self.font_desc = wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL, faceName=".AppleSystemUIFont")
+
+        self.btn_apply = None; self.desc_apply = None; self.pack_label = None
+        self.title_label = None; self.discl = None
+        self._checks_started = False
+        with PROFILE.phase("generate_elements"):
+            self._generate_elements()
+        self.Centre(); self.Show()
+        PROFILE.mark("frame_shown")
+        
+        LM.add_listener(self._on_language_changed, self)
+        self.config.subscribe(self._on_config_changed)
+        self.Bind(wx.EVT_PAINT, self._on_first_paint)
+        wx.CallLater(UPDATE_CHECK_FALLBACK_MS, self._start_update_checks)
+
+    def _on_first_paint(self, event):
+        event.Skip()
+        self.Unbind(wx.EVT_PAINT, handler=self._on_first_paint)
+        PROFILE.mark("first_paint")
+        wx.CallAfter(PROFILE.write_report)
+        wx.CallLater(UPDATE_CHECK_DELAY_MS, self._start_update_checks)
+
+    def _start_update_checks(self):
+        if self._checks_started or not self: return
+        self._checks_started = True
+        from net import get_network
+        self._check_app_updates()
+        get_network().call(self._check_icon_updates)
+
+    def _on_language_changed(self, lang):
+        self._refresh_pack_label()
+        for label in (self.title_label, self.discl):
+            label.Centre(wx.HORIZONTAL)
+        self.Layout()
+
+    def _on_config_changed(self, store, keys):
+        if "selected_pack" in keys:
+            wx.CallAfter(lambda: self and self._refresh_pack_label())
+
+    def _load_saved_language(self):
+        try: LM.load_language(self.config.get("language", "it_it"))
+        except: LM.load_language("it_it")
+
+    def _check_app_updates(self):
+        from net import get_network
+        repo_api = "https://api.github.com/repos/oxideve/SkinX/releases/latest"
+        get_network().fetch(repo_api, on_done=self._on_app_release, timeout=5)
+
+    def _on_app_release(self, r):
+        try:
+            if r.status_code == 200:
+                latest = r.json().get("tag_name", "").replace("v", "")
+                if latest and latest != self.constants.patcher_version:
+                    self._show_app_update_popup(latest, r.json().get("html_url"))
+        except: pass
+
+    def _show_app_update_popup(self, ver, url):
+        msg = f"A new version of SkinX (v{ver}) is available.\nWould you like to visit the download page?"
+        if wx.MessageBox(msg, "App Update", wx.YES_NO | wx.ICON_INFORMATION) == wx.YES:
+            import webbrowser
+            webbrowser.open(url)
+
+    def _check_icon_updates(self):
+        installed_shas = self.config.get("installed_shas", {})
+        if not installed_shas: return
+        from http_cache import get_http_cache
+        try:
+            sources = self.config.get("sources", DEFAULT_SOURCES)
+            
+            for api_url in sources:
+                r = get_http_cache().get(api_url, timeout=10)
+                if r.status_code == 200:
+                    for branch in r.json():
+                        name = branch['name']
+                        remote_sha = branch.get('commit', {}).get('sha')
+                        
+                        if name in installed_shas:
+                            if installed_shas[name] != remote_sha:
+                                wx.CallAfter(self._show_update_popup, name)
+                                return 
+        except: pass
+
+    def _show_update_popup(self, branch_name):
+        msg = LM.get("MSG_UPDATE_ICON_AVAILABLE").replace("{branch}", branch_name)
+        dlg = wx.MessageDialog(self, msg, LM.get("TITLE_UPDATE_AVAILABLE"), wx.YES_NO | wx.ICON_INFORMATION)
+        dlg.SetYesNoLabels(LM.get("BTN_OPEN_SELECTOR"), LM.get("BTN_CANCEL"))
+        if dlg.ShowModal() == wx.ID_YES:
+            self.on_select_version(None)
+        dlg.Destroy()
+
+    def _generate_elements(self):
+        version = self.constants.patcher_version
+        title_label = LM.bind(wx.StaticText(self, pos=(-1, 10)), "TITLE", lambda w, text: w.SetLabel(f"{text} {version}"))
+        title_label.SetFont(wx.Font(19, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD, faceName=".AppleSystemUIFont"))
+        title_label.Centre(wx.HORIZONTAL)
+        self.title_label = title_label
+
+        self.pack_label = wx.StaticText(self, label="", pos=(-1, 40))
+        self.pack_label.SetFont(self.font_model)
+        self._refresh_pack_label()
+
+        menu_configs = [
+            {"key": "MENU_APPLY", "func": self.on_apply_changes, "desc": "DESC_APPLY", "icon": "apply.png"},
+            {"key": "MENU_SELECT", "func": self.on_select_version, "desc": "DESC_SELECT", "icon": "sel.png"},
+            {"key": "MENU_PREF", "func": self.on_open_settings, "desc": "DESC_PREF", "icon": "pref.png"},
+            {"key": "MENU_SUPPORT", "func": self.on_dummy, "desc": "DESC_SUPPORT", "icon": "docs.png"}
+        ]
+
+        assets_dir = resource_path("assets")
+        bx, by, idx = 55, 95, 0
+        for cfg in menu_configs:
+            # Icone già renderizzate a 80px (e @2x) da build_assets.py
+            bmp = get_bitmap(assets_dir, cfg["icon"], MENU_ICON_SIZE)
+            if bmp:
+                wx.StaticBitmap(self, bitmap=bmp, pos=(bx - 15, by), size=(MENU_ICON_SIZE, MENU_ICON_SIZE))
+
+            btn = LM.bind(wx.Button(self, pos=(bx + 75, by), size=(180, 30)), cfg["key"])
+            btn.SetFont(self.font_model); btn.Bind(wx.EVT_BUTTON, cfg["func"])
+            
+            desc = LM.bind(wx.StaticText(self, pos=(bx + 85, by + 35)), cfg["desc"])
+            desc.SetFont(self.font_desc)
+
+            if cfg["key"] == "MENU_APPLY":
+                self.btn_apply = btn; self.desc_apply = desc
+                self.btn_apply.Bind(wx.EVT_UPDATE_UI, self.on_update_apply_ui)
+
+            by += 115; idx += 1
+            if idx == 2: bx, by = 345, 95
+
+        discl = LM.bind(wx.StaticText(self, pos=(-1, 335)), "DISCLAIMER")
+        discl.SetFont(self.font_desc); discl.Centre(wx.HORIZONTAL)
+        self.discl = discl
+
+    def on_update_apply_ui(self, event):
+        if wx.GetKeyState(wx.WXK_SHIFT):
+            event.SetText(LM.get("MENU_RESTORE"))
+            self.desc_apply.SetLabel(LM.get("DESC_RESTORE"))
+        else:
+            event.SetText(LM.get("MENU_APPLY"))
+            self.desc_apply.SetLabel(LM.get("DESC_APPLY"))
+
+    def _refresh_pack_label(self):
+        dl_path = self.helper.downloads_path
+        current = "None"
+        try:
+            selected = self.config.get("selected_pack")
+            if selected and os.path.exists(os.path.join(dl_path, selected)):
+                current = selected
+            else:
+                folders = self.helper.installed_packs()
+                if folders: current = folders[0]
+        except: pass
+        
+        self.pack_label.SetLabel(LM.get("LBL_SELECTED_PACK").replace("{pack}", current))
+        self.pack_label.Centre(wx.HORIZONTAL)
+
+    def on_apply_changes(self, event):
+        if wx.GetKeyState(wx.WXK_SHIFT):
+            if wx.MessageBox(LM.get("MSG_RESTORE_CONFIRM"), LM.get("MENU_RESTORE"), wx.YES_NO | wx.ICON_WARNING) == wx.YES:
+                restore_icons(self.helper, self); self._refresh_pack_label()
+            return
+        
+        if not self.helper.installed_packs():
+            wx.MessageBox(LM.get("MSG_NO_BRANCHES_DOWNLOADED"), "SkinX Info", wx.OK | wx.ICON_INFORMATION)
+            self.on_select_version(None)
+            return
+
+        available = self.helper.get_available_patches()
+        if not available:
+            wx.MessageBox(LM.get("MSG_NO_PATCHES"), "Error", wx.OK | wx.ICON_ERROR); return
+        
+        dlg = IconSelectorDialog(self, available)
+        if dlg.ShowModal() == wx.ID_OK:
+            selected = dlg.GetSelectedItems()
+            if selected:
+                warn_msg = LM.get("MSG_LP_LAYOUT_WARNING")
+                warn_dlg = wx.MessageDialog(self, warn_msg, LM.get("TITLE_WARNING"), wx.OK | wx.CANCEL | wx.ICON_WARNING)
+                if warn_dlg.ShowModal() == wx.ID_OK:
+                    apply_icons(self.helper, selected, True, self)
+        dlg.Destroy()
+
+    def on_select_version(self, event):
+        from wx_select import VersionSelectFrame
+        dlg = VersionSelectFrame(self)
+        if dlg.ShowModal() == wx.ID_OK:
+            self._refresh_pack_label()
+        dlg.Destroy()
+
+    def on_open_settings(self, event):
+        from wx_settings import SettingsFrame
+        SettingsFrame(self).Show()
+    def on_dummy(self, event): wx.MessageBox(LM.get("MSG_NOT_IMPLEMENTED"), "Info")
@@ -1,19 +1,22 @@
 import wx
-import requests
 import threading
 import os
-import zipfile
-import shutil
-import json
 from io import BytesIO
 from locales import LM
+from net import get_network
+from helper import PatcherHelper, merge_branches
+from thumbs import ThumbnailCache, decode_thumbnail
+
+PREVIEW_SIZE = 48
+PREVIEW_CACHE_BYTES = 8 * 1024 * 1024
 
 class VersionItem(wx.Panel):
-    def __init__(self, parent, name, thumb_url, source_name, is_installed=False, has_update=False, download_url=None, sha="", is_error=False, error_detail=""):
+    def __init__(self, parent, name, thumb_url, source_name, is_installed=False, has_update=False, download_url=None, sha="", is_error=False, error_detail="", repo_api="", preview_cache=None):
         super(VersionItem, self).__init__(parent)
         self.is_error = is_error
         self.name = name
         self.download_url = download_url
+        self.repo_api = repo_api
         self.is_installed = is_installed
         self.has_update = has_update
         self.branch_sha = sha
@@ -27,12 +30,12 @@ class VersionItem(wx.Panel):
         self.pic.SetBackgroundColour(wx.Colour(240, 240, 240))
         
         status_text = ""
-        if is_installed:
-            status_text = f" ({LM.get('LBL_INSTALLED')})"
-            if has_update:
-                status_text = " [UPDATE AVAILABLE]"
-        
+        if is_installed and has_update:
+            status_text = " [UPDATE AVAILABLE]"
+
         self.label = wx.StaticText(self, label=f"{name}{status_text}")
+        if is_installed and not has_update:
+            LM.bind(self.label, "LBL_INSTALLED", lambda w, text: w.SetLabel(f"{name} ({text})"))
         self.label.SetFont(wx.Font(13, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD, faceName=".AppleSystemUIFont"))
         
         if has_update:
@@ -57,16 +60,29 @@ class VersionItem(wx.Panel):
             child.Bind(wx.EVT_LEFT_DOWN, self._on_ui_click)
         
         if not is_error:
-            threading.Thread(target=self._load_image, args=(thumb_url,), daemon=True).start()
+            self.preview_cache = preview_cache
+            # Lo sha identifica il contenuto: un'anteprima in cache è valida senza rete
+            self.preview_key = ThumbnailCache.make_key(source_name, name, sha, PREVIEW_SIZE) if sha else None
+            cached = preview_cache.get(self.preview_key) if preview_cache and self.preview_key else None
+            if cached:
+                self._set_preview(*cached)
+            else:
+                get_network().call(self._load_image, thumb_url)
 
     def _load_image(self, url):
         try:
-            resp = requests.get(url, timeout=5)
+            resp = get_network().get(url, timeout=5)
             if resp.status_code == 200:
-                img = wx.Image(BytesIO(resp.content)).Rescale(48, 48, wx.IMAGE_QUALITY_HIGH)
-                wx.CallAfter(self.pic.SetBitmap, wx.Bitmap(img))
+                thumb = decode_thumbnail(BytesIO(resp.content), PREVIEW_SIZE)
+                if self.preview_cache and self.preview_key:
+                    self.preview_cache.put(self.preview_key, *thumb)
+                wx.CallAfter(self._set_preview, *thumb)
         except: pass
 
+    def _set_preview(self, w, h, rgba):
+        if self:
+            self.pic.SetBitmap(wx.Bitmap.FromBufferRGBA(w, h, rgba))
+
     def _on_ui_click(self, event):
         self.GetParent().GetParent().GetParent().select_item(self)
         event.Skip()
@@ -75,19 +91,22 @@ class VersionSelectFrame(wx.Dialog):
     def __init__(self, parent):
         super(VersionSelectFrame, self).__init__(parent, title=LM.get("TITLE_SELECT_VERSION"), size=(550, 400),
                                                style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        LM.bind_title(self, "TITLE_SELECT_VERSION")
         
-        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
-        self.dl_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloads")
+        self.helper = PatcherHelper()
+        self.dl_dir = self.helper.downloads_path
+        self.previews = ThumbnailCache(os.path.join(self.dl_dir, ".cache", "previews"), PREVIEW_CACHE_BYTES)
         self.items = []
         self.selected_item = None
-        self.installed_shas = self._load_installed_shas()
-        self.sources = self._get_sources_from_config()
+        self.progress_dialog = None
+        self.sources = self.helper.list_sources()
+        self._branch_results = {}
 
         self.SetBackgroundColour(wx.Colour(245, 245, 247))
         panel = wx.Panel(self)
         self.main_sizer = wx.BoxSizer(wx.VERTICAL)
 
-        header = wx.StaticText(panel, label=LM.get("LBL_AVAILABLE_BRANCHES"))
+        header = LM.bind(wx.StaticText(panel), "LBL_AVAILABLE_BRANCHES")
         header.SetFont(wx.Font(14, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD, faceName=".AppleSystemUIFont"))
         
         self.scroll = wx.ScrolledWindow(panel, style=wx.VSCROLL | wx.BORDER_SUNKEN)
@@ -99,6 +118,7 @@ class VersionSelectFrame(wx.Dialog):
         self.btn_action = wx.Button(panel, label=LM.get("BTN_DOWNLOAD"), size=(250, 40))
         self.btn_action.Disable()
         self.btn_action.Bind(wx.EVT_BUTTON, self.on_action_click)
+        LM.add_listener(self._on_language_changed, self)
 
         self.main_sizer.Add(header, 0, wx.ALL | wx.CENTER, 20)
         self.main_sizer.Add(self.scroll, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 20)
@@ -108,58 +128,40 @@ class VersionSelectFrame(wx.Dialog):
         self.Centre()
 
         for url in self.sources:
-            threading.Thread(target=self._fetch_branches, args=(url,), daemon=True).start()
-
-    def _load_installed_shas(self):
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r') as f:
-                    return json.load(f).get("installed_shas", {})
-            except: pass
-        return {}
-
-    def _get_sources_from_config(self):
-        default = ["https://api.github.com/repos/oxideve/SkinX-icons/branches"]
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r') as f:
-                    return json.load(f).get("sources", default)
-            except: pass
-        return default
+            get_network().call(self._fetch_branches, url)
 
     def _fetch_branches(self, api_url):
         parts = api_url.split('/')
         source_display = f"{parts[4]}/{parts[5]}" if len(parts) > 5 else api_url
+        branches = []
         try:
-            response = requests.get(api_url, timeout=8)
-            response.raise_for_status()
-            data = response.json()
-
-            for b in data:
-                name = b.get('name')
-                if not name or name in ['main', 'master']: continue
-                
-                sha = b.get('commit', {}).get('sha', "")
-                is_installed = os.path.exists(os.path.join(self.dl_dir, name))
-
-                has_update = False
-                if is_installed and name in self.installed_shas:
-                    if self.installed_shas[name] != sha:
-                        has_update = True
-
-                thumb = f"https://raw.githubusercontent.com/{source_display}/{name}/ver.jpg"
-                dl_url = api_url.replace("api.github.com/repos", "github.com").replace("/branches", "") + f"/archive/refs/heads/{name}.zip"
-                
-                wx.CallAfter(self._add_item, name, thumb, source_display, is_installed, has_update, dl_url, sha)
+            branches = self.helper.list_branches(api_url)
         except Exception as e:
             wx.CallAfter(self._report_error, source_display, str(e))
+        wx.CallAfter(self._on_branches_loaded, api_url, branches)
+
+    def _on_branches_loaded(self, api_url, branches):
+        # Le righe vengono inserite tutte insieme quando ogni sorgente ha risposto
+        self._branch_results[api_url] = branches
+        if set(self.sources) - self._branch_results.keys():
+            return
+        self._add_items(merge_branches(self._branch_results, self.sources))
 
-    def _add_item(self, name, thumb, source, is_installed, has_update, dl_url, sha):
-        item = VersionItem(self.scroll, name, thumb, source, is_installed, has_update, dl_url, sha)
-        self.scroll_sizer.Add(item, 0, wx.EXPAND | wx.BOTTOM, 1)
-        self.items.append(item)
-        self.scroll.Layout()
-        self.scroll.FitInside()
+    def _add_items(self, branches):
+        """ Adds all rows with the list frozen and a single layout pass """
+        self.scroll.Freeze()
+        try:
+            for branch in branches:
+                item = VersionItem(self.scroll, branch['name'], branch['thumb_url'], branch['source'], branch['installed'],
+                                   branch['has_update'], branch['download_url'], branch['sha'], repo_api=branch['repo_api'],
+                                   preview_cache=self.previews)
+                item.branch = branch
+                self.scroll_sizer.Add(item, 0, wx.EXPAND | wx.BOTTOM, 1)
+                self.items.append(item)
+            self.scroll.Layout()
+            self.scroll.FitInside()
+        finally:
+            self.scroll.Thaw()
 
     def select_item(self, target_item):
         self.selected_item = target_item
@@ -181,6 +183,11 @@ class VersionSelectFrame(wx.Dialog):
             
         self.scroll.Refresh()
 
+    def _on_language_changed(self, lang):
+        item = self.selected_item
+        if not item or not (item.has_update or item.is_installed):
+            self.btn_action.SetLabel(LM.get("BTN_DOWNLOAD"))
+
     def on_action_click(self, event):
         if not self.selected_item: return
 
@@ -191,69 +198,38 @@ class VersionSelectFrame(wx.Dialog):
         self.on_download()
 
     def on_download(self):
-        if not os.path.exists(self.dl_dir): os.makedirs(self.dl_dir)
         status_msg = LM.get("STATUS_DOWNLOADING").replace("{branch}", self.selected_item.name)
         self.progress_dialog = wx.ProgressDialog(LM.get("TITLE"), status_msg, 100, self, wx.PD_APP_MODAL | wx.PD_AUTO_HIDE)
-        threading.Thread(target=self._download_thread, args=(self.selected_item.download_url, self.dl_dir, self.selected_item.name, self.selected_item.branch_sha), daemon=True).start()
+        threading.Thread(target=self._download_thread, args=(self.selected_item.branch,), daemon=True).start()
+
+    def _on_progress(self, stage, done, total):
+        if not self.progress_dialog: return
+        if stage == "extract":
+            self.progress_dialog.Update(95, LM.get("STATUS_EXTRACTING"))
+        elif total > 0:
+            self.progress_dialog.Update(min(94, int(done * 94 / total)))
+        else:
+            self.progress_dialog.Pulse()
 
-    def _download_thread(self, url, dl_dir, branch, sha):
+    def _download_thread(self, branch):
         try:
-            response = requests.get(url, stream=True, timeout=15)
-            zip_buffer = BytesIO()
-            downloaded = 0
-            total_size = int(response.headers.get('content-length', 0))
-            for chunk in response.iter_content(4096):
-                zip_buffer.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0: wx.CallAfter(self.progress_dialog.Update, int((downloaded/total_size)*100))
-
-            wx.CallAfter(self.progress_dialog.Update, 95, LM.get("STATUS_EXTRACTING"))
-            with zipfile.ZipFile(zip_buffer) as z:
-                z.extractall(dl_dir)
-                root = z.namelist()[0].split('/')[0]
-                old_path = os.path.join(dl_dir, root)
-                new_path = os.path.join(dl_dir, branch)
-
-                if os.path.exists(new_path): shutil.rmtree(new_path)
-                
-                # Se ci sono altri pack scaricati, li spostiamo in una sottocartella o gestiamo la "selezione"
-                # Per ora, SkinX legge il primo pacchetto trovato, quindi rinominiamo quello scelto
-                # Ma per supportare la multi-selezione, dobbiamo rinominare gli altri o segnare il preferito
-                os.rename(old_path, new_path)
-            
-            self._save_sha_to_config(branch, sha)
-            wx.CallAfter(self._on_finished, branch)
+            progress = lambda stage, done, total: wx.CallAfter(self._on_progress, stage, done, total)
+            self.helper.download_pack(branch, progress)
+            wx.CallAfter(self._on_finished, branch['name'])
         except Exception as e: wx.CallAfter(self._on_error, str(e))
 
-    def _save_sha_to_config(self, branch, sha):
-        try:
-            config = {}
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f: config = json.load(f)
-            if "installed_shas" not in config: config["installed_shas"] = {}
-            config["installed_shas"][branch] = sha
-
-            config["selected_pack"] = branch
-            with open(self.config_path, 'w') as f: json.dump(config, f, indent=4)
-        except: pass
-
     def _finalize_selection(self, branch):
-
-        try:
-            config = {}
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f: config = json.load(f)
-            config["selected_pack"] = branch
-            with open(self.config_path, 'w') as f: json.dump(config, f, indent=4)
-        except: pass
+        self.helper.select_pack(branch)
         self.EndModal(wx.ID_OK)
 
     def _on_finished(self, branch):
         if self.progress_dialog: self.progress_dialog.Destroy()
+        self.progress_dialog = None
         self.EndModal(wx.ID_OK)
 
     def _on_error(self, msg):
         if self.progress_dialog: self.progress_dialog.Destroy()
+        self.progress_dialog = None
         wx.MessageBox(f"Error: {msg}", "Error", wx.OK | wx.ICON_ERROR)
 
     def _report_error(self, source, reason):
@@ -1,13 +1,11 @@
 import wx
-import json
 import os
 import shutil
-import threading
-import requests
-import sys
 from io import BytesIO
 from locales import LM
 from helper import PatcherHelper
+from net import get_network
+from config_store import get_config, DEFAULT_SOURCES
 
 class LanguageItem(wx.Panel):
     def __init__(self, parent, lang_code, is_selected=False):
@@ -26,12 +24,13 @@ class LanguageItem(wx.Panel):
         
         self.bmp = wx.StaticBitmap(self, size=(24, 18))
         
-        display_name = lang_code.replace("_", " ").upper()
+        info = LM.get_lang_info(lang_code)
+        display_name = info["name"]
         self.label = wx.StaticText(self, label=display_name, size=(150, -1))
         font_style = wx.FONTWEIGHT_BOLD if is_selected else wx.FONTWEIGHT_NORMAL
         self.label.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, font_style, faceName=".AppleSystemUIFont"))
 
-        progress_val = LM.get_completion_rate(lang_code)
+        progress_val = info["completion"]
         self.gauge = wx.Gauge(self, range=100, size=(120, 12), style=wx.GA_HORIZONTAL | wx.GA_SMOOTH)
         self.gauge.SetValue(progress_val)
         
@@ -49,11 +48,11 @@ class LanguageItem(wx.Panel):
         self.Bind(wx.EVT_LEFT_DOWN, self._on_click)
 
         flag_url = f"https://flagcdn.com/w40/{iso_code}.png"
-        threading.Thread(target=self._load_flag, args=(flag_url,), daemon=True).start()
+        get_network().call(self._load_flag, flag_url)
 
     def _load_flag(self, url):
         try:
-            resp = requests.get(url, timeout=5)
+            resp = get_network().get(url, timeout=5)
             if resp.status_code == 200:
                 img = wx.Image(BytesIO(resp.content)).Rescale(24, 18, wx.IMAGE_QUALITY_HIGH)
                 wx.CallAfter(self.bmp.SetBitmap, wx.Bitmap(img))
@@ -66,19 +65,21 @@ class SettingsFrame(wx.Frame):
     def __init__(self, parent):
         super().__init__(parent, title=LM.get("MENU_PREF"), size=(550, 720),
                          style=wx.DEFAULT_FRAME_STYLE & ~(wx.RESIZE_BORDER | wx.MAXIMIZE_BOX))
+        LM.bind_title(self, "MENU_PREF")
         
         self.helper = PatcherHelper()
-        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
-        self.default_source = "https://api.github.com/repos/oxideve/SkinX-icons/branches"
+        self.config = get_config()
+        self.default_source = DEFAULT_SOURCES[0]
         self.original_lang = LM.current_lang 
         
         self.SetBackgroundColour(wx.Colour(245, 245, 247))
         panel = wx.Panel(self)
+        self.panel = panel
         self.main_sizer = wx.BoxSizer(wx.VERTICAL)
         self.lang_sizer = wx.BoxSizer(wx.VERTICAL)
 
         # LINGUA
-        lang_header = wx.StaticText(panel, label=LM.get("LBL_LANGUAGE"))
+        lang_header = LM.bind(wx.StaticText(panel), "LBL_LANGUAGE")
         lang_header.SetFont(wx.Font(14, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
         self.lang_scroll = wx.ScrolledWindow(panel, size=(-1, 180), style=wx.VSCROLL | wx.BORDER_SUNKEN)
         self.lang_scroll.SetScrollRate(0, 10)
@@ -86,22 +87,25 @@ class SettingsFrame(wx.Frame):
         self._refresh_lang_list()
 
         # UTILS
-        utils_header = wx.StaticText(panel, label=LM.get("LBL_UTILS"))
+        utils_header = LM.bind(wx.StaticText(panel), "LBL_UTILS")
         utils_header.SetFont(wx.Font(14, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
         
-        self.btn_clear = wx.Button(panel, label=LM.get("BTN_CLEAR_CACHE"))
+        self.btn_clear = LM.bind(wx.Button(panel), "BTN_CLEAR_CACHE")
         self.btn_clear.Bind(wx.EVT_BUTTON, self.on_clear)
         
         self.btn_refresh_lp = wx.Button(panel, label="Refresh Launchpad Layout")
         self.btn_refresh_lp.Bind(wx.EVT_BUTTON, self.on_refresh_launchpad)
         
-        self.btn_revert_all = wx.Button(panel, label=LM.get("BTN_REVERT_ALL"))
+        self.btn_revert_all = LM.bind(wx.Button(panel), "BTN_REVERT_ALL")
         self.btn_revert_all.Bind(wx.EVT_BUTTON, self.on_revert_all)
 
+        self.chk_trace = LM.bind(wx.CheckBox(panel), "CHK_TRACE")
+        self.chk_trace.SetValue(bool(self.config.get("trace", False)))
+
         # FOOTER
         bottom_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        self.btn_cancel = wx.Button(panel, label=LM.get("BTN_CANCEL"))
-        self.btn_save = wx.Button(panel, label=LM.get("BTN_SAVE_CLOSE"))
+        self.btn_cancel = LM.bind(wx.Button(panel), "BTN_CANCEL")
+        self.btn_save = LM.bind(wx.Button(panel), "BTN_SAVE_CLOSE")
         self.btn_cancel.Bind(wx.EVT_BUTTON, self.on_cancel)
         self.btn_save.Bind(wx.EVT_BUTTON, self.on_save_close)
         bottom_sizer.Add(self.btn_cancel, 0, wx.RIGHT, 10)
@@ -115,17 +119,23 @@ class SettingsFrame(wx.Frame):
         self.main_sizer.Add(self.btn_clear, 0, wx.ALL, 10)
         self.main_sizer.Add(self.btn_refresh_lp, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
         self.main_sizer.Add(self.btn_revert_all, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.main_sizer.Add(self.chk_trace, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
         self.main_sizer.AddStretchSpacer(1)
         self.main_sizer.Add(bottom_sizer, 0, wx.EXPAND | wx.ALL, 20)
 
         panel.SetSizer(self.main_sizer)
+        LM.add_listener(self._on_language_changed, self)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.Centre()
 
+    def _on_language_changed(self, lang):
+        self.panel.Layout()
+
     def on_refresh_launchpad(self, event):
         warn_msg = LM.get("MSG_LP_LAYOUT_WARNING")
         dlg = wx.MessageDialog(self, warn_msg, LM.get("TITLE_WARNING"), wx.OK | wx.CANCEL | wx.ICON_WARNING)
         if dlg.ShowModal() == wx.ID_OK:
-            self.helper._refresh_dock()
+            self.helper.refresh_dock()
             wx.MessageBox("Launchpad refreshed!", "SkinX")
         dlg.Destroy()
 
@@ -138,17 +148,7 @@ class SettingsFrame(wx.Frame):
                 os.makedirs(self.helper.downloads_path)
             
             # 2. Resetta SHA e Selezione nel config.json
-            if os.path.exists(self.config_path):
-                try:
-                    with open(self.config_path, 'r') as f:
-                        config = json.load(f)
-                    
-                    config["installed_shas"] = {}
-                    config["selected_pack"] = ""
-                    
-                    with open(self.config_path, 'w') as f:
-                        json.dump(config, f, indent=4)
-                except: pass
+            self.config.update({"installed_shas": {}, "selected_pack": ""})
             
             wx.MessageBox(LM.get("MSG_CACHE_CLEARED"), "SkinX")
 
@@ -166,23 +166,21 @@ class SettingsFrame(wx.Frame):
         self._refresh_lang_list()
 
     def on_save_close(self, event):
-        config_data = {}
-        if os.path.exists(self.config_path):
-            with open(self.config_path, 'r') as f: config_data = json.load(f)
-        
-        config_data["language"] = LM.current_lang
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4)
-
-        if LM.current_lang != self.original_lang:
-            os.execl(sys.executable, sys.executable, *sys.argv)
-        else:
-            self.Close()
+        # La lingua è già applicata alle finestre aperte: basta salvarla
+        self.config.update({"language": LM.current_lang, "trace": self.chk_trace.GetValue()})
+        self.original_lang = LM.current_lang
+        self.Close()
 
     def on_cancel(self, event):
         LM.load_language(self.original_lang)
         self.Close()
 
+    def on_close(self, event):
+        # Chiusa dal pulsante della finestra: la lingua non salvata va annullata come con Annulla
+        if LM.current_lang != self.original_lang:
+            LM.load_language(self.original_lang)
+        event.Skip()
+
     def on_revert_all(self, event):
         if wx.MessageBox(LM.get("MSG_CONFIRM_REVERT_ALL"), "Revert", wx.YES_NO) == wx.ID_YES:
             LM.load_language("it_it")